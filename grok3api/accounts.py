@@ -0,0 +1,235 @@
+import bisect
+import hashlib
+import heapq
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from grok3api.limiter import OK, RATE_LIMITED, AUTH_ERROR, CANCELLED
+from grok3api.logger import logger
+
+
+def account_id(cookies: Union[str, dict]) -> str:
+    """Stable id of a cookie set. Only the id is persisted, never the cookies."""
+    return hashlib.sha256(json.dumps(cookies, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass
+class Account:
+    """One cookie set of an AccountPool and its health."""
+    cookies: Union[str, dict]
+    id: str
+    health: float = 1.0
+    successes: int = 0
+    failures: int = 0
+    rate_limited: int = 0
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+    in_flight: int = 0
+    version: int = 0
+
+    @property
+    def success_rate(self) -> float:
+        total = self.successes + self.failures
+        return self.successes / total if total else 1.0
+
+    def cooling(self, now: Optional[float] = None) -> bool:
+        return self.cooldown_until > (now if now is not None else time.time())
+
+
+class AccountPool:
+    """
+    Cookie sets (accounts) with health tracking, used by GrokClient instead of rotating the list it was given.
+
+    The best account (fewest requests in flight, then best health) is picked from a heap in O(log n).
+    A rate limit puts the account on an exponentially growing cooldown, a credential error on the longest one.
+    A history_id is pinned to an account by consistent hashing, so the server-side conversation of a chat
+    keeps using the account it was started with (as long as that account is not cooling down),
+    and adding or removing an account moves only a small share of the chats.
+
+    :param cookies: Cookie sets, in any format GrokClient accepts.
+    :param state_path: JSON file to persist health and cooldowns to, so they survive restarts.
+    :param cooldown: Cooldown after the first rate limit, in seconds. Doubles on every further one.
+    :param max_cooldown: Longest cooldown, also used for credential errors.
+    :param replicas: Points per account on the hash ring.
+    """
+
+    HEALTH_SMOOTHING = 0.1
+
+    def __init__(self,
+                 cookies: List[Union[str, dict]],
+                 state_path: Optional[str] = None,
+                 cooldown: float = 60,
+                 max_cooldown: float = 3600,
+                 replicas: int = 64):
+        self.state_path = state_path
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self._accounts: Dict[str, Account] = {}
+        for item in cookies:
+            account = Account(cookies=item, id=account_id(item))
+            self._accounts.setdefault(account.id, account)
+        self._ring: List[Tuple[int, str]] = sorted(
+            (self._hash(f"{identifier}#{replica}"), identifier)
+            for identifier in self._accounts for replica in range(replicas))
+        self._ready: List[Tuple[int, float, int, str]] = []
+        self._cooling: List[Tuple[float, int, str]] = []
+        self._load_state()
+        for account in self._accounts.values():
+            self._push(account)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    @property
+    def ids(self) -> Tuple[str, ...]:
+        return tuple(self._accounts)
+
+    def _push(self, account: Account):
+        """Adds the current state of an account to a heap. Older entries of it become stale and are skipped. Lock held."""
+        account.version += 1
+        if account.cooling():
+            heapq.heappush(self._cooling, (account.cooldown_until, account.version, account.id))
+        else:
+            heapq.heappush(self._ready, (account.in_flight, -account.health, account.version, account.id))
+        if len(self._ready) + len(self._cooling) > 4 * len(self._accounts) + 16:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._ready = [(a.in_flight, -a.health, a.version, a.id) for a in self._accounts.values() if not a.cooling()]
+        self._cooling = [(a.cooldown_until, a.version, a.id) for a in self._accounts.values() if a.cooling()]
+        heapq.heapify(self._ready)
+        heapq.heapify(self._cooling)
+
+    def _refresh(self, now: float):
+        """Moves accounts whose cooldown has passed back to the ready heap. Lock held."""
+        while self._cooling and self._cooling[0][0] <= now:
+            _, version, identifier = heapq.heappop(self._cooling)
+            account = self._accounts[identifier]
+            if account.version == version:
+                self._push(account)
+
+    def _best(self) -> Optional[Account]:
+        while self._ready:
+            _, _, version, identifier = self._ready[0]
+            account = self._accounts[identifier]
+            if account.version == version and not account.cooling():
+                return account
+            heapq.heappop(self._ready)
+        return None
+
+    def _pinned(self, history_id: str) -> Optional[Account]:
+        """First account on the hash ring at or after the history_id that is not cooling down."""
+        if not self._ring:
+            return None
+        start = bisect.bisect_left(self._ring, (self._hash(history_id), ""))
+        seen = set()
+        for offset in range(len(self._ring)):
+            identifier = self._ring[(start + offset) % len(self._ring)][1]
+            if identifier in seen:
+                continue
+            seen.add(identifier)
+            account = self._accounts[identifier]
+            if not account.cooling():
+                return account
+            if len(seen) == len(self._accounts):
+                break
+        return None
+
+    def acquire(self, history_id: Optional[str] = None) -> Optional[Account]:
+        """Takes the account for a request, or returns None if every account is cooling down. Pair with release()."""
+        with self._lock:
+            self._refresh(time.time())
+            account = self._pinned(history_id) if history_id is not None else self._best()
+            if account is None:
+                return None
+            account.in_flight += 1
+            self._push(account)
+            return account
+
+    def release(self, account: Account, outcome: str = OK):
+        """Returns the account and records the outcome of its request (see grok3api.limiter outcomes)."""
+        with self._lock:
+            account.in_flight = max(account.in_flight - 1, 0)
+            if outcome == CANCELLED:
+                self._push(account)
+                return
+            success = outcome == OK
+            account.health += self.HEALTH_SMOOTHING * ((1.0 if success else 0.0) - account.health)
+            if success:
+                account.successes += 1
+                account.consecutive_failures = 0
+            else:
+                account.failures += 1
+                account.consecutive_failures += 1
+            if outcome in (RATE_LIMITED, AUTH_ERROR):
+                if outcome == RATE_LIMITED:
+                    account.rate_limited += 1
+                    cooldown = min(self.cooldown * 2 ** (account.consecutive_failures - 1), self.max_cooldown)
+                else:
+                    cooldown = self.max_cooldown
+                account.cooldown_until = time.time() + cooldown
+                logger.debug(f"Account {account.id}: {outcome}, cooling down for {int(cooldown)} sec")
+            self._push(account)
+            if not success:
+                self._save_state()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return {account.id: {
+                "health": round(account.health, 3),
+                "success_rate": round(account.success_rate, 3),
+                "rate_limited": account.rate_limited,
+                "in_flight": account.in_flight,
+                "cooldown_remaining": max(0.0, round(account.cooldown_until - now, 1)),
+            } for account in self._accounts.values()}
+
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+            for identifier, saved in state.items():
+                account = self._accounts.get(identifier)
+                if account is None:
+                    continue
+                for name in ("health", "successes", "failures", "rate_limited", "consecutive_failures", "cooldown_until"):
+                    if name in saved:
+                        setattr(account, name, saved[name])
+        except Exception as e:
+            logger.error(f"In AccountPool._load_state: {e}")
+
+    def _save_state(self):
+        """Writes the state atomically. Lock held."""
+        if not self.state_path:
+            return
+        state = {account.id: {
+            "health": account.health,
+            "successes": account.successes,
+            "failures": account.failures,
+            "rate_limited": account.rate_limited,
+            "consecutive_failures": account.consecutive_failures,
+            "cooldown_until": account.cooldown_until,
+        } for account in self._accounts.values()}
+        try:
+            directory = os.path.dirname(os.path.abspath(self.state_path))
+            with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False, encoding="utf-8") as file:
+                json.dump(state, file)
+            os.replace(file.name, self.state_path)
+        except OSError as e:
+            logger.error(f"In AccountPool._save_state: {e}")
+
+    def save(self):
+        with self._lock:
+            self._save_state()
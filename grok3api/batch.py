@@ -0,0 +1,188 @@
+"""
+Runs a file of prompts through GrokClient.
+
+    python -m grok3api.batch prompts.jsonl -o results.jsonl --concurrency 4
+
+Input is JSONL (a string or an object with "message" or "prompt", an optional "id" and any other ask() arguments
+per line) or CSV (a "message" or "prompt" column and an optional "id" column).
+Every result is appended to the output JSONL as soon as it is ready. The output is also the checkpoint:
+running the same command again skips the prompts that already succeeded, so a crash or Ctrl-C loses nothing.
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from grok3api.logger import logger
+from grok3api.types.BatchResult import BatchResult
+
+
+def read_prompts(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yields (id, prompt) pairs, where prompt is a dict with "message" and ask() arguments."""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as file:
+            for number, row in enumerate(csv.DictReader(file)):
+                message = row.get("message") or row.get("prompt")
+                if message:
+                    yield str(row.get("id") or number), {"message": message}
+        return
+
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.error(f"Skipping line {number + 1} of {path}: {e}")
+                continue
+            if isinstance(item, str):
+                item = {"message": item}
+            if not isinstance(item, dict):
+                logger.error(f"Skipping line {number + 1} of {path}: expected a string or an object")
+                continue
+            item = dict(item)
+            item_id = str(item.pop("id", number))
+            prompt = item.pop("prompt", None)
+            item["message"] = item.get("message") or prompt
+            if not item["message"]:
+                logger.error(f"Skipping line {number + 1} of {path}: no message")
+                continue
+            yield item_id, item
+
+
+def read_checkpoint(path: str) -> Set[str]:
+    """Ids of the prompts that already have a successful result in the output file."""
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and not record.get("error"):
+                done.add(str(record.get("id")))
+    return done
+
+
+def result_record(item_id: str, result: BatchResult) -> Dict[str, Any]:
+    record: Dict[str, Any] = {"id": item_id, "message": result.message}
+    if result.response is not None:
+        summary = result.response.summary()
+        record.update(response=summary.message,
+                      responseId=summary.responseId,
+                      conversationId=summary.conversationId,
+                      generatedImageUrls=result.response.raw.get("modelResponse", {}).get("generatedImageUrls", []),
+                      error_code=summary.error_code)
+    record.update(error=result.error, attempts=result.attempts, elapsed=round(result.elapsed, 3))
+    return record
+
+
+def percentile(values: List[float], percent: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(percent / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class BatchReport:
+    def __init__(self, skipped: int):
+        self.skipped = skipped
+        self.started = time.monotonic()
+        self.latencies: List[float] = []
+        self.errors: Counter = Counter()
+        self.succeeded = 0
+
+    def add(self, result: BatchResult):
+        self.latencies.append(result.elapsed)
+        if result.ok:
+            self.succeeded += 1
+        else:
+            self.errors[str(result.error)[:120]] += 1
+
+    def format(self) -> str:
+        elapsed = time.monotonic() - self.started
+        done = len(self.latencies)
+        lines = [
+            f"Processed: {done} ({self.succeeded} ok, {done - self.succeeded} failed), skipped from checkpoint: {self.skipped}",
+            f"Elapsed: {elapsed:.1f} s, throughput: {done / elapsed if elapsed else 0:.2f} prompts/s",
+        ]
+        if self.latencies:
+            lines.append("Latency: p50 {:.2f} s, p90 {:.2f} s, p99 {:.2f} s".format(
+                *(percentile(self.latencies, p) for p in (50, 90, 99))))
+        for error, count in self.errors.most_common(10):
+            lines.append(f"  {count} x {error}")
+        return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a JSONL/CSV file of prompts through Grok.")
+    parser.add_argument("input", help="JSONL or CSV file with prompts")
+    parser.add_argument("-o", "--output", help="Output JSONL (default: <input>.results.jsonl). Also used as the checkpoint.")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Concurrent requests (default: 4)")
+    parser.add_argument("--model", default="grok-3", help="Model for prompts that do not set modelName (default: grok-3)")
+    parser.add_argument("--retries", type=int, default=0,
+                        help="Extra runs of a failed prompt, on top of the client's own retries (default: 0)")
+    parser.add_argument("--timeout", type=int, default=None, help="Timeout of one request in seconds")
+    parser.add_argument("--ordered", action="store_true", help="Write results in input order")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and overwrite the output")
+    parser.add_argument("--proxy", default=os.getenv("GROK_PROXY", None), help="Proxy (default: env GROK_PROXY)")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.input)[0] + ".results.jsonl"
+    if args.restart and os.path.exists(output):
+        os.remove(output)
+    done = read_checkpoint(output)
+
+    ids: Dict[int, str] = {}
+    indexes = itertools.count()
+
+    def pending_prompts() -> Iterator[Dict[str, Any]]:
+        for item_id, prompt in read_prompts(args.input):
+            if item_id not in done:
+                ids[next(indexes)] = item_id
+                yield prompt
+
+    from grok3api.client import GrokClient
+
+    client = GrokClient(cookies=os.getenv("GROK_COOKIES", None), proxy=args.proxy, always_new_conversation=True)
+    kwargs: Dict[str, Any] = {"modelName": args.model}
+    if args.timeout is not None:
+        kwargs["timeout"] = args.timeout
+
+    report = BatchReport(skipped=len(done))
+    interrupted = False
+    with open(output, "a+", encoding="utf-8") as file:
+        if file.tell() > 0:
+            file.seek(file.tell() - 1)
+            if file.read(1) != "\n":
+                file.write("\n")  # a crash may have left half a line
+        try:
+            for result in client.ask_many(pending_prompts(), concurrency=args.concurrency, ordered=args.ordered,
+                                          retries=args.retries, **kwargs):
+                file.write(json.dumps(result_record(ids.pop(result.index), result), ensure_ascii=False) + "\n")
+                file.flush()
+                report.add(result)
+        except (KeyboardInterrupt, SystemExit):
+            # The driver turns Ctrl-C into SystemExit after closing the browser.
+            interrupted = True
+
+    print(report.format())
+    if interrupted:
+        print(f"Interrupted. Run the same command again to resume from {output}.")
+        return 130
+    return 0 if not report.errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
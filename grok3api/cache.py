@@ -0,0 +1,330 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from grok3api.logger import logger
+
+
+class DiskCache:
+    """
+    Size-bounded LRU cache of byte blobs stored as files in one directory.
+
+    Writes are atomic (temporary file + rename), so a crash never leaves a half-written entry.
+    The LRU order is kept in memory and mirrored to file modification times, so it survives restarts.
+
+    :param directory: Directory for the cache files. Created if missing.
+    :param max_bytes: Total size limit. Least recently used entries are evicted above it.
+    :param use_mmap: Read entries through a memory map instead of a regular read.
+    """
+
+    TMP_SUFFIX = ".tmp"
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024, use_mmap: bool = False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.use_mmap = use_mmap
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith(self.TMP_SUFFIX):
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, name, stat.st_size))
+            except OSError:
+                continue
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._size += size
+        self._evict()
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _touch(self, name: str):
+        """Marks an entry as recently used. Must be called with the lock held."""
+        self._index.move_to_end(name)
+        try:
+            os.utime(self._path(name))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Removes least recently used entries until the cache fits. Must be called with the lock held."""
+        while self._size > self.max_bytes and self._index:
+            name, size = self._index.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+    def __contains__(self, key: str) -> bool:
+        return self._name(key) in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def path_for(self, key: str) -> Optional[str]:
+        """Returns the file of a cached entry (marking it as used), or None on a miss."""
+        name = self._name(key)
+        with self._lock:
+            if name not in self._index:
+                self.misses += 1
+                return None
+            if not os.path.exists(self._path(name)):
+                self._size -= self._index.pop(name)
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touch(name)
+            return self._path(name)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns cached bytes, or None on a miss."""
+        path = self.path_for(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as file:
+                if self.use_mmap and os.fstat(file.fileno()).st_size > 0:
+                    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        return mapped[:]
+                return file.read()
+        except OSError as e:
+            logger.debug(f"In DiskCache.get: {e}")
+            self.delete(key)
+            return None
+
+    def get_mmap(self, key: str) -> Optional[mmap.mmap]:
+        """Returns a read-only memory map of a cached entry without copying it. The caller must close it."""
+        path = self.path_for(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as file:
+                return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logger.debug(f"In DiskCache.get_mmap: {e}")
+            return None
+
+    def copy_to(self, key: str, path: str) -> bool:
+        """Copies a cached entry to a file. Returns False on a miss."""
+        cached_path = self.path_for(key)
+        if cached_path is None:
+            return False
+        try:
+            shutil.copyfile(cached_path, path)
+            return True
+        except OSError as e:
+            logger.debug(f"In DiskCache.copy_to: {e}")
+            return False
+
+    def set(self, key: str, data: bytes):
+        """Stores bytes under a key, evicting old entries if the cache gets too big."""
+        if len(data) > self.max_bytes:
+            return
+        name = self._name(key)
+        try:
+            with tempfile.NamedTemporaryFile("wb", dir=self.directory, suffix=self.TMP_SUFFIX, delete=False) as file:
+                file.write(data)
+            os.replace(file.name, self._path(name))
+        except OSError as e:
+            logger.error(f"In DiskCache.set: {e}")
+            return
+        with self._lock:
+            self._size += len(data) - self._index.get(name, 0)
+            self._index[name] = len(data)
+            self._index.move_to_end(name)
+            self._evict()
+
+    def delete(self, key: str):
+        name = self._name(key)
+        with self._lock:
+            if name in self._index:
+                self._size -= self._index.pop(name)
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            for name in list(self._index):
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass
+            self._index.clear()
+            self._size = 0
+
+
+image_cache: Optional[DiskCache] = None
+
+
+def configure_image_cache(directory: str, max_bytes: int = 512 * 1024 * 1024, use_mmap: bool = False) -> DiskCache:
+    """Enables the on-disk cache for generated images, keyed by asset URL."""
+    global image_cache
+    image_cache = DiskCache(directory, max_bytes=max_bytes, use_mmap=use_mmap)
+    return image_cache
+
+
+def disable_image_cache():
+    global image_cache
+    image_cache = None
+
+
+class MemoryCacheBackend:
+    """In-memory LRU backend for ResponseCache, bounded by total size in bytes."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def delete(self, key: str):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCacheBackend:
+    """On-disk LRU backend for ResponseCache; entries survive restarts."""
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self._cache = DiskCache(directory, max_bytes=max_bytes)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: bytes):
+        self._cache.set(key, value)
+
+    def delete(self, key: str):
+        self._cache.delete(key)
+
+    def clear(self):
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class ResponseCache:
+    """
+    Exact-match cache of Grok responses, keyed on a normalized hash of the request payload.
+
+    :param backend: Storage with get/set/delete/clear (MemoryCacheBackend, DiskCacheBackend, or your own). Defaults to memory.
+    :param ttl: Time in seconds a response stays valid.
+    """
+
+    def __init__(self, backend=None, ttl: float = 300):
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @staticmethod
+    def make_key(request: dict) -> str:
+        """Hashes everything that determines the answer. Key order and surrounding whitespace of the message do not matter."""
+        normalized = dict(request)
+        if isinstance(normalized.get("message"), str):
+            normalized["message"] = normalized["message"].strip()
+        encoded = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Returns the cached raw response, or None on a miss or if it has expired."""
+        try:
+            raw = self.backend.get(key)
+            if raw is not None:
+                entry = json.loads(raw)
+                if entry.get("expires_at", 0) > time.time():
+                    self.hits += 1
+                    return entry["data"]
+                self.backend.delete(key)
+        except Exception as e:
+            logger.debug(f"In ResponseCache.get: {e}")
+        self.misses += 1
+        return None
+
+    def set(self, key: str, data: dict):
+        try:
+            entry = {"expires_at": time.time() + self.ttl, "data": data}
+            self.backend.set(key, json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+            self.stores += 1
+        except Exception as e:
+            logger.debug(f"In ResponseCache.set: {e}")
+
+    def clear(self):
+        self.backend.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_ratio": self.hit_ratio,
+            "entries": len(self.backend) if hasattr(self.backend, "__len__") else None,
+        }
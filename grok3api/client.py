@@ -1,17 +1,43 @@
 import asyncio
+import contextlib
+import contextvars
+import hashlib
+import inspect
 import os
-from typing import Optional, List, Union, Dict, Any, Tuple
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Optional, List, Union, Dict, Any, Tuple, Callable, Iterable, Iterator, AsyncIterable, AsyncIterator
 import base64
 import json
 from io import BytesIO
 
+from grok3api.accounts import AccountPool, account_id
 from grok3api.history import History, SenderType
+from grok3api.limiter import AdaptiveLimiter, OK, RATE_LIMITED, AUTH_ERROR, ERROR, CANCELLED
 from grok3api import driver
-from grok3api.logger import logger
+from grok3api.cache import configure_image_cache, ResponseCache
+from grok3api.concurrency import SingleFlight, AsyncSingleFlight, RequestHandle
+from grok3api.hedging import HedgePolicy
+from grok3api.logger import logger, debug_event
+from grok3api import metrics
+from grok3api.metrics import MetricsSink, Spans, NULL_SPANS
+from grok3api.proxies import ProxyPool
+from grok3api.retry import RetryPolicy, Attempt, classify, RATE_LIMIT, AUTH, REGION, CHALLENGE, TRANSPORT, REQUEST, \
+    CANCELLED as CANCELLED_ERROR
+from grok3api.types.BatchResult import BatchResult
 from grok3api.types.GrokResponse import GrokResponse
+from grok3api.types.ImageProgress import ImageProgress
+from grok3api.watchdog import RecyclePolicy, start_watchdog
 
 
 
+# (client, conversation state) of the ask_many() prompt running in the current context
+_conversation_scope: contextvars.ContextVar = contextvars.ContextVar("grok3api_conversation", default=None)
+
+
 class GrokClient:
     """
     Client for interacting with Grok.
@@ -27,14 +53,92 @@ class GrokClient:
     :param response_id: (str) ID of Grok's response in the conversation_id chat. If you want to continue the conversation from where it left off. Must be paired with conversation_id.
     :param timeout: Maximum time for client initialization. Defaults to: 120 seconds
     :param custom_personality: (str) Customize Grok personality.
+    :param profile_dir: (str) Persistent Chrome profile directory used instead of incognito mode, so restarts come back up warm.
+    :param session_snapshot_path: (str) File to export cookies and localStorage to and restore them from when a new browser starts.
+    :param block_resources: (bool / List[str]) Block resources the client never needs (fonts, media, analytics). `True` uses the default list, a list sets custom URL patterns.
+    :param image_cache_dir: (str) Directory for the on-disk cache of generated images. Repeated downloads of the same image are served from it without the browser.
+    :param image_cache_size: (int) Size limit of the image cache in bytes. Defaults to 512 MB.
+    :param response_cache: (ResponseCache) Opt-in exact-match cache: identical requests (message, model, flags, attachments, conversation) within its TTL are answered without the browser.
+    :param recycle_policy: (RecyclePolicy) Thresholds (requests, age, memory, error rate) after which a background watchdog restarts the browser between requests.
+    :param coalesce_requests: (bool) Identical concurrent ask() / async_ask() calls wait for one request to Grok and share its response. Defaults to False.
+    :param limiter: (AdaptiveLimiter) Adapts the allowed concurrency and requests per minute of every account/proxy pair to the rate limits Grok reports. See GrokClient.limits().
+    :param account_state_path: (str) JSON file where the health and cooldowns of a list of cookie sets are kept across restarts.
+    :param retry_policy: (RetryPolicy) Attempts, time budget and backoff of ask(). Per-attempt timings are in GrokResponse.attempts.
+    :param hedge_policy: (HedgePolicy) Sends a second copy of a new conversation whose first byte is late and uses the faster one. Defaults to None (no hedging).
+    :param metrics_sink: (MetricsSink) Receives the time spent in every phase of each ask() (see grok3api.metrics); the spans are also in GrokResponse.spans. Defaults to None (not recorded).
+    :param on_response: (Callable[[GrokResponse], Any]) Called with the final response of every ask() that was run, e.g. to count its attempts. Coalesced calls share one run, so it is called once for them. Defaults to None.
+    :param proxy_pool: (ProxyPool) Probed proxies; every new browser started without `proxy` gets the fastest healthy one, and a region block switches to another healthy proxy instead of the default one.
     """
 
     NEW_CHAT_URL = "https://grok.com/rest/app-chat/conversations/new"
     CONVERSATION_URL = "https://grok.com/rest/app-chat/conversations/" # + {conversationId}/responses/
     max_tries: int = 5
+    STREAM_POLL_INTERVAL = 0.1
+
+    START_STREAM_SCRIPT = """
+    const [id, url, headers, body, timeoutMs] = arguments;
+    const streams = window.__grok3api_streams = window.__grok3api_streams || {};
+    const entry = streams[id] = { chunks: [], done: false, error: null, status: null, controller: new AbortController() };
+    const timer = setTimeout(() => entry.controller.abort(), timeoutMs);
+    fetch(url, {
+        method: 'POST',
+        headers: headers,
+        body: body,
+        credentials: 'include',
+        signal: entry.controller.signal
+    })
+    .then(async response => {
+        if (!response.ok) {
+            entry.status = response.status;
+            entry.error = 'Error: HTTP ' + response.status + ' - ' + await response.text();
+            return;
+        }
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            entry.chunks.push(decoder.decode(value, { stream: true }));
+        }
+        entry.chunks.push(decoder.decode());
+    })
+    .catch(error => {
+        entry.error = error.name === 'AbortError' ? 'TimeoutError' : 'Error: ' + error;
+        if (entry.status === null) {
+            entry.status = 0;  // no HTTP error response: the network failed or the body was cut off
+        }
+    })
+    .finally(() => {
+        clearTimeout(timer);
+        entry.done = true;
+    });
+    return id;
+    """
+
+    POLL_STREAM_SCRIPT = """
+    const streams = window.__grok3api_streams || {};
+    const entry = streams[arguments[0]];
+    if (!entry) {
+        return { chunk: '', done: true, error: 'Error: the request was lost (page reloaded?)', status: 0 };
+    }
+    const result = { chunk: entry.chunks.splice(0).join(''), done: entry.done, error: entry.error, status: entry.status };
+    if (entry.done) {
+        delete streams[arguments[0]];
+    }
+    return result;
+    """
+
+    ABORT_STREAM_SCRIPT = """
+    const streams = window.__grok3api_streams || {};
+    const entry = streams[arguments[0]];
+    if (entry) {
+        delete streams[arguments[0]];
+        entry.controller.abort();
+    }
+    """
 
     def __init__(self,
-                 cookies: Union[Union[str, List[str]], Union[dict, List[dict]]] = None,
+                 cookies: Union[Union[str, List[str]], Union[dict, List[dict]], AccountPool] = None,
                  use_xvfb: bool = True,
                  proxy: Optional[str] = None,
                  history_msg_count: int = 0,
@@ -45,7 +149,22 @@ class GrokClient:
                  conversation_id: Optional[str] = None,
                  response_id: Optional[str] = None,
                  timeout: int = driver.web_driver.TIMEOUT,
-                 custom_personality: Optional[str] = None):
+                 custom_personality: Optional[str] = None,
+                 profile_dir: Optional[str] = None,
+                 session_snapshot_path: Optional[str] = None,
+                 block_resources: Union[bool, List[str]] = False,
+                 image_cache_dir: Optional[str] = None,
+                 image_cache_size: int = 512 * 1024 * 1024,
+                 response_cache: Optional[ResponseCache] = None,
+                 recycle_policy: Optional[RecyclePolicy] = None,
+                 coalesce_requests: bool = False,
+                 limiter: Optional[AdaptiveLimiter] = None,
+                 account_state_path: Optional[str] = None,
+                 proxy_pool: Optional[ProxyPool] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 hedge_policy: Optional[HedgePolicy] = None,
+                 metrics_sink: Optional[MetricsSink] = None,
+                 on_response: Optional[Callable[[GrokResponse], Any]] = None):
         try:
             if (conversation_id is None) != (response_id is None):
                 raise ValueError(
@@ -62,22 +181,194 @@ class GrokClient:
             self.timeout: int = timeout
 
             self.always_new_conversation: bool = always_new_conversation
-            self.conversationId: Optional[str] = conversation_id
-            self.parentResponseId: Optional[str] = response_id
+            self._conversation: Dict[str, Optional[str]] = {"conversationId": conversation_id,
+                                                            "parentResponseId": response_id}
 
             self.customPersonality: Optional[str] = custom_personality
-
-            driver.web_driver.init_driver(use_xvfb=self.use_xvfb, timeout=timeout, proxy=self.proxy)
+            self.response_cache: Optional[ResponseCache] = response_cache
+            self._flight: Optional[SingleFlight] = SingleFlight() if coalesce_requests else None
+            self._async_flight: Optional[AsyncSingleFlight] = AsyncSingleFlight() if coalesce_requests else None
+
+            self.limiter: Optional[AdaptiveLimiter] = limiter
+            self.retry_policy: RetryPolicy = retry_policy or RetryPolicy(max_attempts=self.max_tries)
+            self.hedge_policy: Optional[HedgePolicy] = hedge_policy
+            self.metrics_sink: Optional[MetricsSink] = metrics_sink
+            self.on_response: Optional[Callable[[GrokResponse], Any]] = on_response
+            self.account_state_path: Optional[str] = account_state_path
+            self._accounts: Optional[AccountPool] = None
+
+            if block_resources is True:
+                blocked_urls = driver.web_driver.DEFAULT_BLOCKED_URLS
+            else:
+                blocked_urls = block_resources or None
+            if proxy_pool is not None:
+                driver.web_driver.set_proxy_pool(proxy_pool)
+            driver.web_driver.init_driver(use_xvfb=self.use_xvfb, timeout=timeout, proxy=self.proxy,
+                                          profile_dir=profile_dir, snapshot_path=session_snapshot_path,
+                                          blocked_urls=blocked_urls)
+            if image_cache_dir is not None:
+                configure_image_cache(image_cache_dir, max_bytes=image_cache_size)
+            if recycle_policy is not None:
+                start_watchdog(recycle_policy)
         except Exception as e:
             logger.error(f"In GrokClient.__init__: {e}")
             raise e
 
+    def _conversation_state(self) -> Dict[str, Optional[str]]:
+        """The conversation ask() continues: the client's own one, or a private one inside _own_conversation()."""
+        scope = _conversation_scope.get()
+        if scope is not None and scope[0] is self:
+            return scope[1]
+        return self._conversation
+
+    @property
+    def conversationId(self) -> Optional[str]:
+        return self._conversation_state()["conversationId"]
+
+    @conversationId.setter
+    def conversationId(self, value: Optional[str]):
+        self._conversation_state()["conversationId"] = value
+
+    @property
+    def parentResponseId(self) -> Optional[str]:
+        return self._conversation_state()["parentResponseId"]
+
+    @parentResponseId.setter
+    def parentResponseId(self, value: Optional[str]):
+        self._conversation_state()["parentResponseId"] = value
+
+    @contextlib.contextmanager
+    def _own_conversation(self):
+        """Requests made inside neither use nor change the client's conversation, so concurrent prompts cannot mix."""
+        token = _conversation_scope.set((self, {"conversationId": None, "parentResponseId": None}))
+        try:
+            yield
+        finally:
+            _conversation_scope.reset(token)
+
+    def _start_stream(self, target_url: str, payload: dict, headers: dict, timeout: int) -> str:
+        request_id = uuid.uuid4().hex
+        driver.web_driver.execute_script(self.START_STREAM_SCRIPT, request_id, target_url, headers,
+                                         json.dumps(payload), timeout * 1000)
+        return request_id
+
+    def _abort_stream(self, request_id: str):
+        try:
+            driver.web_driver.execute_script(self.ABORT_STREAM_SCRIPT, request_id)
+        except Exception as e:
+            logger.debug(f"In _abort_stream: {e}")
+
+    def _stream_request(self,
+                        target_url: str,
+                        payload: dict,
+                        headers: dict,
+                        timeout: int,
+                        on_line: Callable[[dict], None],
+                        handle: Optional[RequestHandle] = None) -> Tuple[str, Optional[int]]:
+        """
+        Starts the request in the page without waiting for it and polls the response body while it arrives.
+        Every complete JSON line is passed to on_line as soon as it is received.
+        With a hedge_policy, a new conversation that has no first byte after the hedge delay is sent a second time;
+        the first copy to answer is used and the other one is aborted.
+        Cancelling the handle aborts the fetch in the page and returns 'Cancelled'.
+        Returns the whole body, or an error string in the same format as the blocking fetch,
+        together with the HTTP status of an error (0 if no HTTP response arrived, e.g. a network failure or a lost page).
+        """
+        hedging = self.hedge_policy is not None and target_url == self.NEW_CHAT_URL
+        hedge_after = self.hedge_policy.delay() if hedging else None
+        handle = handle or RequestHandle()
+        streams = []
+
+        spans = metrics.current_spans()
+
+        def start() -> str:
+            with spans.span(metrics.EXECUTE_SCRIPT):
+                request_id = self._start_stream(target_url, payload, headers, timeout)
+            streams.append(request_id)
+            if not handle.attach(request_id, lambda: self._abort_stream(request_id)):
+                self._abort_stream(request_id)
+            return request_id
+
+        def abort(request_id: str):
+            handle.detach(request_id)
+            self._abort_stream(request_id)
+
+        started = time.perf_counter()
+        first = start()
+        winner = None
+        body = []
+        pending = ""
+        deadline = started + timeout + 5
+        try:
+            while True:
+                if handle.cancelled:
+                    return "Cancelled", None
+                for request_id in list(streams):
+                    state = driver.web_driver.execute_script(self.POLL_STREAM_SCRIPT, request_id)
+                    if handle.cancelled:
+                        return "Cancelled", None
+                    chunk = state.get("chunk") or ""
+                    if winner is None:
+                        if not chunk and not state.get("done"):
+                            continue
+                        if state.get("done") and state.get("error") and len(streams) > 1:
+                            streams.remove(request_id)  # the other copy may still answer
+                            handle.detach(request_id)
+                            continue
+                        winner = request_id
+                        for other in streams:
+                            if other != winner:
+                                abort(other)
+                        streams[:] = [winner]
+                        spans.add(metrics.FIRST_BYTE, started, time.perf_counter())
+                        if hedging:
+                            self.hedge_policy.record(time.perf_counter() - started, hedge_won=winner != first)
+                    if chunk:
+                        body.append(chunk)
+                        pending += chunk
+                        *lines, pending = pending.split("\n")
+                        for line in lines:
+                            try:
+                                on_line(json.loads(line))
+                            except json.JSONDecodeError:
+                                continue
+                            except Exception as e:
+                                logger.error(f"In _stream_request callback: {e}")
+                    if state.get("done"):
+                        spans.add(metrics.BODY, started, time.perf_counter())
+                        streams.clear()
+                        if state.get("error"):
+                            return state["error"], state.get("status")
+                        return "".join(body), None
+                if time.perf_counter() > deadline:
+                    return "TimeoutError", None
+                if hedge_after is not None and winner is None and time.perf_counter() - started >= hedge_after:
+                    hedge_after = None
+                    if self.hedge_policy.allow():
+                        debug_event("Hedging the request", waited=round(time.perf_counter() - started, 2))
+                        start()
+                handle.wait(self.STREAM_POLL_INTERVAL)
+        finally:
+            for request_id in streams:
+                abort(request_id)
+
+    @staticmethod
+    def _image_progress_from_line(parsed: dict) -> Optional[ImageProgress]:
+        result = parsed.get("result", {})
+        data = result.get("response", {}).get("streamingImageGenerationResponse") \
+            or result.get("streamingImageGenerationResponse")
+        return ImageProgress.from_dict(data) if isinstance(data, dict) else None
+
     def _send_request(self,
                       payload,
                       headers,
-                      timeout=driver.web_driver.TIMEOUT):
+                      timeout=driver.web_driver.TIMEOUT,
+                      on_image_progress: Optional[Callable[[ImageProgress], Any]] = None,
+                      handle: Optional[RequestHandle] = None):
         try:
-            """Send a request through the browser with a timeout."""
+            """Send a request through the browser with a timeout.
+            The response is polled while it arrives, so concurrent requests overlap and the handle can abort it;
+            with on_image_progress, image generation frames are reported as they arrive."""
 
             headers.update({
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36",
@@ -97,42 +388,29 @@ class GrokClient:
 
             target_url = self.CONVERSATION_URL + self.conversationId + "/responses" if self.conversationId else self.NEW_CHAT_URL
 
-            fetch_script = f"""
-            const controller = new AbortController();
-            const signal = controller.signal;
-            setTimeout(() => controller.abort(), {timeout * 1000});
-
-            const payload = {json.dumps(payload)};
-            return fetch('{target_url}', {{
-                method: 'POST',
-                headers: {json.dumps(headers)},
-                body: JSON.stringify(payload),
-                credentials: 'include',
-                signal: signal
-            }})
-            .then(response => {{
-                if (!response.ok) {{
-                    return response.text().then(text => 'Error: HTTP ' + response.status + ' - ' + text);
-                }}
-                return response.text();
-            }})
-            .catch(error => {{
-                if (error.name === 'AbortError') {{
-                    return 'TimeoutError';
-                }}
-                return 'Error: ' + error;
-            }});
-            """
-            response = driver.web_driver.execute_script(fetch_script)
+            def on_line(parsed: dict):
+                progress = self._image_progress_from_line(parsed) if on_image_progress is not None else None
+                if progress is not None:
+                    on_image_progress(progress)
+
+            response, status = self._stream_request(target_url, payload, headers, timeout, on_line, handle)
+
+            if response == 'Cancelled':
+                return {"error_code": "Cancelled", "error": "The request was cancelled", "details": []}
+            if response == 'TimeoutError':
+                return {"error_code": "Timeout", "error": "TimeoutError", "details": []}
 
             if isinstance(response, str) and response.startswith('Error:'):
                 error_data = self.handle_str_error(response)
                 if isinstance(error_data, dict):
+                    if status is not None:
+                        error_data["status"] = status
                     return error_data
 
             if response and 'This service is not available in your region' in response:
                 return 'This service is not available in your region'
 
+            parse_started = time.perf_counter()
             final_dict = {}
             conversation_info = {}
             new_title = None
@@ -168,16 +446,102 @@ class GrokClient:
                 final_dict["result"]["response"]["temporary"] = conversation_info.get("temporary")
                 final_dict["result"]["response"]["newTitle"] = new_title
 
-                if not self.always_new_conversation and model_response.get("responseId"):
-                    self.conversationId = self.conversationId or conversation_info.get("conversationId")
-                    self.parentResponseId = model_response.get("responseId") if self.conversationId else None
+                self._advance_conversation(final_dict)
 
-            logger.debug(f"Received response: {final_dict}")
+            metrics.current_spans().add(metrics.PARSE, parse_started, time.perf_counter())
+            debug_event("Received response", sampled=True, response=final_dict)
             return final_dict
         except Exception as e:
             logger.error(f"In _send_request: {e}")
             return {}
 
+    def _advance_conversation(self, response: dict):
+        """Makes the next ask() continue the conversation of a successful response."""
+        response_data = response.get("result", {}).get("response", {})
+        response_id = response_data.get("modelResponse", {}).get("responseId")
+        if not self.always_new_conversation and response_id:
+            self.conversationId = self.conversationId or response_data.get("conversationId")
+            self.parentResponseId = response_id if self.conversationId else None
+
+    def _recover(self, error_class: str, proxy: Optional[str], use_cookies: bool,
+                 accounts: Optional[AccountPool], transport_failures: int, since_epoch: Optional[int] = None) -> str:
+        """
+        Recovery action after a failed attempt of ask(). Returns its name for the attempt report.
+        Actions on the shared browser wait until no other request is using it (see WebDriverSingleton.recover).
+        """
+        web_driver = driver.web_driver
+        if error_class in (RATE_LIMIT, AUTH):
+            if use_cookies and accounts is not None:
+                return "next_account"  # the pool has put the account on cooldown
+            web_driver.recover(web_driver.restart_session, since_epoch)
+            return "without_cookies" if use_cookies else "restart_session"
+        if error_class == REGION:
+            web_driver.recover(lambda: web_driver.set_proxy(proxy), since_epoch)
+            return "set_proxy"
+        if error_class == CHALLENGE or (error_class == TRANSPORT and transport_failures > 1):
+            def restart_browser():
+                web_driver.close_driver(save_snapshot=False)
+                web_driver.init_driver()
+
+            web_driver.recover(restart_browser, since_epoch)
+            return "restart_browser"
+        web_driver.recover(web_driver.restart_session, since_epoch)
+        return "restart_session"
+
+    def _account_pool(self) -> Optional[AccountPool]:
+        """AccountPool for the cookies of the client: the pool itself, or one built once for a list of cookie sets."""
+        if isinstance(self.cookies, AccountPool):
+            return self.cookies
+        if not isinstance(self.cookies, list) or not self.cookies:
+            return None
+        ids = tuple(dict.fromkeys(account_id(cookies) for cookies in self.cookies))
+        if self._accounts is None or self._accounts.ids != ids:
+            self._accounts = AccountPool(self.cookies, state_path=self.account_state_path)
+        return self._accounts
+
+    @staticmethod
+    def _limit_key(cookies: Union[None, str, dict]) -> str:
+        """Limiter key of the account (a hash of its cookies) and the proxy of the browser."""
+        account = account_id(cookies) if cookies else "anonymous"
+        return f"{account}@{driver.web_driver.current_proxy or 'direct'}"
+
+    @staticmethod
+    def _limit_outcome(response: Any) -> str:
+        error_class = classify(response)
+        if error_class is None:
+            return OK
+        return {RATE_LIMIT: RATE_LIMITED, AUTH: AUTH_ERROR, CANCELLED_ERROR: CANCELLED}.get(error_class, ERROR)
+
+    def _limited_send_request(self, cookies: Union[None, str, dict], payload: dict, headers: dict, timeout: int,
+                              on_image_progress: Optional[Callable[[ImageProgress], Any]] = None,
+                              handle: Optional[RequestHandle] = None):
+        """_send_request within the limits of the account/proxy pair, reporting the outcome back to the limiter."""
+        if self.limiter is None:
+            return self._send_request(payload, headers, timeout, on_image_progress, handle)
+        key = self._limit_key(cookies)
+        with metrics.current_spans().span(metrics.LIMITER_WAIT):
+            acquired = self.limiter.acquire(key, timeout=timeout)
+        if not acquired:
+            return self.handle_str_error(f"Error: rate limit of {key} not available within {timeout} seconds")
+        started = time.monotonic()
+        response = {}
+        try:
+            response = self._send_request(payload, headers, timeout, on_image_progress, handle)
+            return response
+        finally:
+            self.limiter.release(key, self._limit_outcome(response), time.monotonic() - started)
+
+    def _record_spans(self, spans: Spans, model: str, attempts: List[Attempt]):
+        error_class = attempts[-1].error_class if attempts else None
+        try:
+            self.metrics_sink.record(spans.totals(), {"model": model, "outcome": error_class or "ok"})
+        except Exception as e:
+            logger.error(f"In _record_spans: {e}")
+
+    def limits(self) -> Dict[str, Dict[str, Any]]:
+        """Current limits and counters of every account/proxy pair (empty without a limiter)."""
+        return self.limiter.snapshot() if self.limiter is not None else {}
+
     IMAGE_SIGNATURES = {
         b'\xff\xd8\xff': ("jpg", "image/jpeg"),
         b'\x89PNG\r\n\x1a\n': ("png", "image/png"),
@@ -197,6 +561,36 @@ class GrokClient:
                 return ext, mime
         return "jpg", "image/jpeg"
 
+    def _read_file_input(self, file_input: Union[str, BytesIO]) -> bytes:
+        """Returns the bytes of a file path, a base64 image string, or a BytesIO object."""
+        if isinstance(file_input, str):
+            if os.path.exists(file_input):
+                with open(file_input, "rb") as f:
+                    return f.read()
+            elif self._is_base64_image(file_input):
+                return base64.b64decode(file_input)
+            else:
+                raise ValueError("The string is neither a valid file path nor a valid base64 image string")
+        elif isinstance(file_input, BytesIO):
+            return file_input.getvalue()
+        else:
+            raise ValueError("file_input must be a file path, a base64 string, or a BytesIO object")
+
+    def _request_key(self,
+                     payload: dict,
+                     images: Union[Optional[List[Union[str, BytesIO]]], str, BytesIO] = None,
+                     new_conversation: bool = False) -> str:
+        """
+        Normalized hash of everything that determines the answer: the payload, the target conversation,
+        and the content of images to upload (their fileMetadataIds would differ on every upload).
+        """
+        request = dict(payload)
+        request["conversationId"] = None if new_conversation else self.conversationId
+        if images:
+            image_list = images if isinstance(images, list) else [images]
+            request["images"] = [hashlib.sha256(self._read_file_input(image)).hexdigest() for image in image_list]
+        return ResponseCache.make_key(request)
+
     def _upload_image(self,
                       file_input: Union[str, BytesIO],
                       file_extension: str = "jpg",
@@ -215,18 +609,7 @@ class GrokClient:
         Raises:
             ValueError: If the input data is invalid or the response does not contain fileMetadataId.
         """
-        if isinstance(file_input, str):
-            if os.path.exists(file_input):
-                with open(file_input, "rb") as f:
-                    file_content = f.read()
-            elif self._is_base64_image(file_input):
-                file_content = base64.b64decode(file_input)
-            else:
-                raise ValueError("The string is neither a valid file path nor a valid base64 image string")
-        elif isinstance(file_input, BytesIO):
-            file_content = file_input.getvalue()
-        else:
-            raise ValueError("file_input must be a file path, a base64 string, or a BytesIO object")
+        file_content = self._read_file_input(file_input)
 
         if file_extension is None or file_mime_type is None:
             ext, mime = self._get_extension_and_mime_from_header(file_content)
@@ -267,12 +650,13 @@ class GrokClient:
         .catch(error => 'Error: ' + error);
         """
 
+        epoch = driver.web_driver.cookie_epoch
         response = driver.web_driver.execute_script(fetch_script)
 
         capcha = "Just a moment" in response
         if (isinstance(response, str) and response.startswith('Error:')) or capcha:
             if 'Too many requests' in response or 'Bad credentials' in response or capcha:
-                driver.web_driver.restart_session()
+                driver.web_driver.recover(driver.web_driver.restart_session, epoch)
                 response = driver.web_driver.execute_script(fetch_script)
                 if isinstance(response, str) and response.startswith('Error:'):
                     raise ValueError(response)
@@ -284,24 +668,82 @@ class GrokClient:
 
         return response["fileMetadataId"]
 
+    def _build_payload(self, message: str, history_id: Optional[str], new_conversation: bool, temporary: bool,
+                       modelName: str, fileAttachments: Optional[List[str]], imageAttachments: Optional[List],
+                       customInstructions: str, deepsearch_preset: str, disableSearch: bool,
+                       enableImageGeneration: bool, enableImageStreaming: bool, enableSideBySide: bool,
+                       imageGenerationCount: int, isPreset: bool, isReasoning: bool, returnImageBytes: bool,
+                       returnRawGrokInXaiRequest: bool, sendFinalMetadata: bool,
+                       toolOverrides: Optional[Dict[str, Any]]) -> dict:
+        """Request body for ask(). Does not change the client state."""
+        message_payload = self._messages_with_possible_history(history_id, message, new_conversation)
+
+        payload = {
+            "temporary": temporary,
+            "modelName": modelName,
+            "message": message_payload,
+            "fileAttachments": fileAttachments if fileAttachments is not None else [],
+            "imageAttachments": imageAttachments if imageAttachments is not None else [],
+            "customInstructions": customInstructions,
+            "deepsearch preset": deepsearch_preset,
+            "disableSearch": disableSearch,
+            "enableImageGeneration": enableImageGeneration,
+            "enableImageStreaming": enableImageStreaming,
+            "enableSideBySide": enableSideBySide,
+            "imageGenerationCount": imageGenerationCount,
+            "isPreset": isPreset,
+            "isReasoning": isReasoning,
+            "returnImageBytes": returnImageBytes,
+            "returnRawGrokInXaiRequest": returnRawGrokInXaiRequest,
+            "sendFinalMetadata": sendFinalMetadata,
+            "toolOverrides": toolOverrides if toolOverrides is not None else {}
+        }
+        if self.parentResponseId and not new_conversation:
+            payload["parentResponseId"] = self.parentResponseId
+        if self.customPersonality:
+            payload["customPersonality"] = self.customPersonality
+        return payload
+
     def _clean_conversation(self, payload: dict, history_id: str, message: str):
         if payload and "parentResponseId" in payload:
             del payload["parentResponseId"]
-        payload["message"] = self._messages_with_possible_history(history_id, message)
+        payload["message"] = self._messages_with_possible_history(history_id, message, new_conversation=True)
         self.conversationId = None
         self.parentResponseId = None
 
-    def _messages_with_possible_history(self, history_id: str, message: str) -> str:
+    def _messages_with_possible_history(self, history_id: str, message: str, new_conversation: bool = False) -> str:
         if (self.history.history_msg_count < 1 and self.history.main_system_prompt is None
                 and history_id not in self.history.system_prompts):
             message_payload = message
-        elif self.parentResponseId and self.conversationId:
+        elif self.parentResponseId and self.conversationId and not new_conversation:
             message_payload = message
         else:
             message_payload = self.history.get_history(history_id) + '\n' + message
         return message_payload
 
 
+    _PAYLOAD_ARGUMENTS = ("temporary", "modelName", "fileAttachments", "imageAttachments", "customInstructions",
+                          "deepsearch_preset", "disableSearch", "enableImageGeneration", "enableImageStreaming",
+                          "enableSideBySide", "imageGenerationCount", "isPreset", "isReasoning", "returnImageBytes",
+                          "returnRawGrokInXaiRequest", "sendFinalMetadata", "toolOverrides")
+
+    def _flight_key(self, arguments: Dict[str, Any]) -> Optional[str]:
+        """Key under which identical concurrent ask() calls are coalesced, or None if the call must run on its own."""
+        if arguments["on_image_progress"] is not None or arguments.get("handle") is not None:
+            return None
+        new_conversation = bool(arguments["new_conversation"])
+        payload = self._build_payload(arguments["message"], arguments["history_id"], new_conversation,
+                                      *(arguments[name] for name in self._PAYLOAD_ARGUMENTS))
+        try:
+            key = self._request_key(payload, arguments["images"], new_conversation)
+        except Exception as e:
+            logger.debug(f"In _flight_key: {e}")
+            return None
+        if self.history.history_msg_count > 0:
+            # Each caller writes the answer to its own history, so different histories are never merged.
+            key += f":{arguments['history_id']}"
+        return key
+
     def send_message(self,
                      message: str,
                      history_id: Optional[str] = None,
@@ -337,10 +779,13 @@ class GrokClient:
                         returnImageBytes: bool = False,
                         returnRawGrokInXaiRequest: bool = False,
                         sendFinalMetadata: bool = True,
-                        toolOverrides: Optional[Dict[str, Any]] = None) -> GrokResponse:
+                        toolOverrides: Optional[Dict[str, Any]] = None,
+                        on_image_progress: Optional[Callable[[ImageProgress], Any]] = None,
+                        use_cache: bool = True) -> GrokResponse:
         """
         Asynchronous wrapper for the ask method.
         Sends a request to the Grok API with a single message and additional parameters.
+        Cancelling the task aborts the request in the browser.
 
         Args:
             message (str): User's message to send to the API.
@@ -366,39 +811,41 @@ class GrokClient:
             returnRawGrokInXaiRequest (bool): Return raw output from the model. Defaults to False.
             sendFinalMetadata (bool): Send final metadata with the request. Defaults to True.
             toolOverrides (Optional[Dict[str, Any]]): Dictionary to override tool settings. Defaults to an empty dictionary.
+            on_image_progress (Optional[Callable[[ImageProgress], Any]]): Called with every intermediate image generation frame (requires enableImageStreaming). Defaults to None.
+            use_cache (bool): Look the request up in the client's response_cache (if one is configured). Defaults to True.
 
         Return:
             GrokResponse: Response from the Grok API as an object.
         """
+        arguments = dict(locals())
+        del arguments["self"]
+        if on_image_progress is not None and asyncio.iscoroutinefunction(on_image_progress):
+            loop = asyncio.get_running_loop()
+            async_callback = on_image_progress
+
+            def on_image_progress(progress: ImageProgress):
+                asyncio.run_coroutine_threadsafe(async_callback(progress), loop)
+
+            arguments["on_image_progress"] = on_image_progress
+
         try:
-            return await asyncio.to_thread(self.ask,
-                                           message=message,
-                                           history_id=history_id,
-                                           proxy=proxy,
-                                           new_conversation=new_conversation,
-                                           timeout=timeout,
-                                           temporary=temporary,
-                                           modelName=modelName,
-                                           images=images,
-                                           fileAttachments=fileAttachments,
-                                           imageAttachments=imageAttachments,
-                                           customInstructions=customInstructions,
-                                           deepsearch_preset=deepsearch_preset,
-                                           disableSearch=disableSearch,
-                                           enableImageGeneration=enableImageGeneration,
-                                           enableImageStreaming=enableImageStreaming,
-                                           enableSideBySide=enableSideBySide,
-                                           imageGenerationCount=imageGenerationCount,
-                                           isPreset=isPreset,
-                                           isReasoning=isReasoning,
-                                           returnImageBytes=returnImageBytes,
-                                           returnRawGrokInXaiRequest=returnRawGrokInXaiRequest,
-                                           sendFinalMetadata=sendFinalMetadata,
-                                           toolOverrides=toolOverrides)
+            key = self._flight_key(arguments) if self._async_flight is not None else None
+            if key is None:
+                return await self._ask_in_thread(arguments)
+            return await self._async_flight.do(key, lambda: self._ask_in_thread(arguments))
         except Exception as e:
             logger.error(f"In async_ask: {e}")
             return GrokResponse({})
 
+    async def _ask_in_thread(self, arguments: Dict[str, Any]) -> GrokResponse:
+        """Runs ask() in a worker thread. Cancelling the awaiting task aborts the request in the browser."""
+        handle = RequestHandle()
+        try:
+            return await asyncio.to_thread(self.ask, **dict(arguments, handle=handle))
+        except asyncio.CancelledError:
+            handle.cancel()
+            raise
+
     def ask(self,
             message: str,
             history_id: Optional[str] = None,
@@ -422,7 +869,10 @@ class GrokClient:
             returnImageBytes: bool = False,
             returnRawGrokInXaiRequest: bool = False,
             sendFinalMetadata: bool = True,
-            toolOverrides: Optional[Dict[str, Any]] = None
+            toolOverrides: Optional[Dict[str, Any]] = None,
+            on_image_progress: Optional[Callable[[ImageProgress], Any]] = None,
+            use_cache: bool = True,
+            handle: Optional[RequestHandle] = None
             ) -> GrokResponse:
         """
         Sends a request to the Grok API with a single message and additional parameters.
@@ -451,17 +901,56 @@ class GrokClient:
             returnRawGrokInXaiRequest (bool): Return raw output from the model. Defaults to False.
             sendFinalMetadata (bool): Send final metadata with the request. Defaults to True.
             toolOverrides (Optional[Dict[str, Any]]): Dictionary to override tool settings. Defaults to an empty dictionary.
+            on_image_progress (Optional[Callable[[ImageProgress], Any]]): Called with every intermediate image generation frame (requires enableImageStreaming). Defaults to None.
+            use_cache (bool): Look the request up in the client's response_cache (if one is configured). Defaults to True.
+            handle (Optional[RequestHandle]): Lets another thread cancel the request with handle.cancel(), which aborts it in the browser. Defaults to None.
 
         Return:
             GrokResponse: Response from the Grok API as an object.
         """
-        if timeout is None:
-            timeout = self.timeout
-
+        arguments = dict(locals())
+        del arguments["self"]
+        key = self._flight_key(arguments) if self._flight is not None else None
+        if key is None:
+            return self._ask(**arguments)
+        return self._flight.do(key, lambda: self._ask(**arguments))
+
+    def _ask(self,
+             message: str,
+             history_id: Optional[str],
+             proxy: Optional[str],
+             new_conversation: Optional[bool],
+             timeout: Optional[int],
+             temporary: bool,
+             modelName: str,
+             images: Union[Optional[List[Union[str, BytesIO]]], str, BytesIO],
+             fileAttachments: Optional[List[str]],
+             imageAttachments: Optional[List],
+             customInstructions: str,
+             deepsearch_preset: str,
+             disableSearch: bool,
+             enableImageGeneration: bool,
+             enableImageStreaming: bool,
+             enableSideBySide: bool,
+             imageGenerationCount: int,
+             isPreset: bool,
+             isReasoning: bool,
+             returnImageBytes: bool,
+             returnRawGrokInXaiRequest: bool,
+             sendFinalMetadata: bool,
+             toolOverrides: Optional[Dict[str, Any]],
+             on_image_progress: Optional[Callable[[ImageProgress], Any]],
+             use_cache: bool,
+             handle: Optional[RequestHandle]) -> GrokResponse:
+        timeout = int(self.timeout if timeout is None else timeout)  # may come from an environment variable as a str
 
         if images is not None and fileAttachments is not None:
             raise ValueError("'images' and 'fileAttachments' cannot be used together")
         last_error_data = {}
+        request_started = False
+        attempts: List[Attempt] = []
+        spans = Spans() if self.metrics_sink is not None else NULL_SPANS
+        spans_token = metrics.activate(spans)
         try:
 
             base_headers = {
@@ -477,164 +966,410 @@ class GrokClient:
 
             headers = base_headers.copy()
 
-            if images:
-                fileAttachments = []
-                if isinstance(images, list):
-                    for image in images:
-                        fileAttachments.append(self._upload_image(image))
-                else:
-                    fileAttachments.append(self._upload_image(images))
-
-
-            message_payload = self._messages_with_possible_history(history_id, message)
-
-            payload = {
-                "temporary": temporary,
-                "modelName": modelName,
-                "message": message_payload,
-                "fileAttachments": fileAttachments if fileAttachments is not None else [],
-                "imageAttachments": imageAttachments if imageAttachments is not None else [],
-                "customInstructions": customInstructions,
-                "deepsearch preset": deepsearch_preset,
-                "disableSearch": disableSearch,
-                "enableImageGeneration": enableImageGeneration,
-                "enableImageStreaming": enableImageStreaming,
-                "enableSideBySide": enableSideBySide,
-                "imageGenerationCount": imageGenerationCount,
-                "isPreset": isPreset,
-                "isReasoning": isReasoning,
-                "returnImageBytes": returnImageBytes,
-                "returnRawGrokInXaiRequest": returnRawGrokInXaiRequest,
-                "sendFinalMetadata": sendFinalMetadata,
-                "toolOverrides": toolOverrides if toolOverrides is not None else {}
-            }
-            if self.parentResponseId:
-                payload["parentResponseId"] = self.parentResponseId
-            if self.customPersonality:
-                payload["customPersonality"] = self.customPersonality
+            payload = self._build_payload(message, history_id, False, temporary, modelName, fileAttachments,
+                                          imageAttachments, customInstructions, deepsearch_preset, disableSearch,
+                                          enableImageGeneration, enableImageStreaming, enableSideBySide,
+                                          imageGenerationCount, isPreset, isReasoning, returnImageBytes,
+                                          returnRawGrokInXaiRequest, sendFinalMetadata, toolOverrides)
 
-            logger.debug(f"Grok payload: {payload}")
+            debug_event("Grok payload", sampled=True, payload=payload)
             if new_conversation:
                 self._clean_conversation(payload, history_id, message)
 
-            try_index = 0
-            response = ""
+            cache_key = None
+            if self.response_cache is not None and use_cache:
+                cache_key = self._request_key(payload, images)
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    logger.debug("Response served from the response cache.")
+                    last_error_data = cached
+                    self._advance_conversation(cached)
+                    response = GrokResponse(cached)
+                    if self.history.history_msg_count > 0:
+                        self.history.add_message(history_id, SenderType.ASSISTANT, response.modelResponse.message)
+                        if self.history_auto_save:
+                            with spans.span(metrics.HISTORY_SAVE):
+                                self.history.to_file()
+                    return response
+
+            with spans.span(metrics.DRIVER_INIT):
+                driver.web_driver.begin_request()
+            request_started = True
+
+            policy = self.retry_policy
+            deadline = time.monotonic() + policy.budget(timeout)
+            image_list = (images if isinstance(images, list) else [images]) if images else []
+            uploaded_for = None
             use_cookies: bool = self.cookies is not None
-
-            is_list_cookies = isinstance(self.cookies, list)
-
-            while try_index < self.max_tries:
-                logger.debug(
-                    f"Attempt {try_index + 1} of {self.max_tries}" + (" (Without cookies)" if not use_cookies else ""))
-                cookies_used = 0
-
-                while cookies_used < (len(self.cookies) if is_list_cookies else 1) or not use_cookies:
-                    if use_cookies:
-                        current_cookies = self.cookies[0] if is_list_cookies else self.cookies
+            accounts = self._account_pool()
+            transport_failures = 0
+            response = {}
+            handle = handle or RequestHandle()
+
+            for number in range(1, policy.max_attempts + 1):
+                if handle.cancelled:
+                    last_error_data = {"error_code": "Cancelled", "error": "The request was cancelled", "details": []}
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    debug_event("ask() deadline exceeded", budget=policy.budget(timeout), attempts=number - 1)
+                    break
+                attempt_timeout = max(1, int(min(timeout, remaining)))
+                started = time.monotonic()
+
+                account = None
+                if use_cookies and accounts is not None:
+                    account = accounts.acquire(history_id)
+                    if account is None:
+                        logger.debug("All accounts are cooling down, continuing without cookies")
+                        use_cookies = False
+                        driver.web_driver.recover(driver.web_driver.restart_session)
+                epoch = driver.web_driver.cookie_epoch
+                current_cookies = (account.cookies if account is not None else self.cookies) if use_cookies else None
+
+                response = {}
+                try:
+                    with spans.span(metrics.SET_COOKIES):
                         driver.web_driver.set_cookies(current_cookies)
-                        if images:
-                            fileAttachments = []
-                            if isinstance(images, list):
-                                for image in images:
-                                    fileAttachments.append(self._upload_image(image))
-                            else:
-                                fileAttachments.append(self._upload_image(images))
-                            payload["fileAttachments"] = fileAttachments if fileAttachments is not None else []
-
-                    logger.debug(
-                        f"Sending request (cookie[{cookies_used}]): headers={headers}, payload={payload}, timeout={timeout} seconds")
-
+                    # Uploaded files belong to the session, so they are uploaded again after it changes.
+                    session = (id(current_cookies), driver.web_driver.cookie_epoch, driver.web_driver.generation)
+                    if image_list and session != uploaded_for:
+                        with spans.span(metrics.UPLOAD_IMAGE):
+                            payload["fileAttachments"] = [self._upload_image(image) for image in image_list]
+                        uploaded_for = session
                     if new_conversation:
                         self._clean_conversation(payload, history_id, message)
-                    response = self._send_request(payload, headers, timeout)
-
-                    if response == {} and try_index != 0:
-                        try_index += 1
-                        driver.web_driver.close_driver()
-                        driver.web_driver.init_driver()
-
-                        self._clean_conversation(payload, history_id, message)
-
-                        continue
-
-                    if isinstance(response, dict) and response:
-                        last_error_data = response
-                        str_response = str(response)
-                        if 'Too many requests' in str_response or 'credentials' in str_response:
-                            self._clean_conversation(payload, history_id, message)
-                            cookies_used += 1
-
-                            if not is_list_cookies or cookies_used >= len(self.cookies) - 1:
-                                self._clean_conversation(payload, history_id, message)
-                                driver.web_driver.restart_session()
-                                use_cookies = False
-                                if images:
-                                    fileAttachments = []
-                                    if isinstance(images, list):
-                                        for image in images:
-                                            fileAttachments.append(self._upload_image(image))
-                                    else:
-                                        fileAttachments.append(self._upload_image(images))
-                                    payload["fileAttachments"] = fileAttachments if fileAttachments is not None else []
-                                continue
-                            if is_list_cookies and len(self.cookies) > 1:
-                                self._clean_conversation(payload, history_id, message)
-                                self.cookies.append(self.cookies.pop(0))
-                                continue
-
-                        elif 'This service is not available in your region' in str_response:
-                            driver.web_driver.set_proxy(proxy)
-                            break
-
-                        elif 'Just a moment' in str_response or '403' in str_response:
-                            driver.web_driver.close_driver()
-                            driver.web_driver.init_driver()
-                            self._clean_conversation(payload, history_id, message)
-                            break
-                        else:
-                            response = GrokResponse(response)
-                            assistant_message = response.modelResponse.message
-
-                            if self.history.history_msg_count > 0:
-                                self.history.add_message(history_id, SenderType.ASSISTANT, assistant_message)
-                                if self.history_auto_save:
-                                    self.history.to_file()
-
-                            return response
-                    else:
-                        break
-
-                if is_list_cookies and cookies_used >= len(self.cookies):
+                    debug_event("Sending request", sampled=True, attempt=number, max_attempts=policy.max_attempts,
+                                cookies=use_cookies, timeout=attempt_timeout, headers=headers, payload=payload)
+                    response = self._limited_send_request(current_cookies, payload, headers, attempt_timeout,
+                                                          on_image_progress, handle)
+                except Exception as e:
+                    logger.debug(f"In ask attempt {number}: {e}")
+                    response = self.handle_str_error(f"Error: {e}")
+                    response["error_code"] = "Transport"
+                finally:
+                    if account is not None:
+                        accounts.release(account, self._limit_outcome(response))
+
+                error_class = classify(response)
+                if isinstance(response, dict) and response:
+                    last_error_data = response
+                attempt = Attempt(number=number, error_class=error_class, duration=time.monotonic() - started,
+                                  account=account.id if account is not None else None)
+                attempts.append(attempt)
+
+                if error_class is None or error_class == REQUEST:
+                    if error_class is None and cache_key is not None:
+                        self.response_cache.set(cache_key, response)
+                    response = GrokResponse(response)
+                    assistant_message = response.modelResponse.message
+
+                    if self.history.history_msg_count > 0:
+                        self.history.add_message(history_id, SenderType.ASSISTANT, assistant_message)
+                        if self.history_auto_save:
+                            with spans.span(metrics.HISTORY_SAVE):
+                                self.history.to_file()
+
+                    return response
+                if error_class == CANCELLED_ERROR:
                     break
 
-                try_index += 1
-
-                if try_index == self.max_tries - 1:
+                transport_failures = transport_failures + 1 if error_class == TRANSPORT else 0
+                if number < policy.max_attempts:
+                    with spans.span(metrics.RECOVERY):
+                        attempt.recovery = self._recover(error_class, proxy, use_cookies, accounts, transport_failures,
+                                                         epoch)
+                    if attempt.recovery == "without_cookies":
+                        use_cookies = False
                     self._clean_conversation(payload, history_id, message)
+                    attempt.delay = min(policy.backoff(number, error_class), max(deadline - time.monotonic(), 0))
+                debug_event("Attempt failed", attempt=number, error_class=error_class,
+                            duration=round(attempt.duration, 2), recovery=attempt.recovery, delay=round(attempt.delay, 2))
+                if attempt.delay:
+                    handle.wait(attempt.delay)
 
-                    driver.web_driver.close_driver()
-                    driver.web_driver.init_driver()
-
-                self._clean_conversation(payload, history_id, message)
-                driver.web_driver.restart_session()
-
-            logger.debug(f"(In ask) Bad response: {response}")
-            driver.web_driver.restart_session()
+            debug_event("(In ask) Bad response", sampled=True, response=response)
             self._clean_conversation(payload, history_id, message)
 
             if not last_error_data:
-                last_error_data = self.handle_str_error(response)
+                last_error_data = self.handle_str_error(f"No response from Grok after {len(attempts)} attempts")
 
         except Exception as e:
             logger.debug(f"In ask: {e}")
             if not last_error_data:
                 last_error_data = self.handle_str_error(str(e))
         finally:
+            if request_started:
+                driver.web_driver.end_request(success=not last_error_data.get("error"))
             if self.history.history_msg_count > 0:
                 self.history.add_message(history_id, SenderType.ASSISTANT, message)
                 if self.history_auto_save:
-                    self.history.to_file()
-            return GrokResponse(last_error_data)
+                    with spans.span(metrics.HISTORY_SAVE):
+                        self.history.to_file()
+            result = GrokResponse(last_error_data)
+            result.attempts = attempts
+            metrics.deactivate(spans_token)
+            if spans.enabled:
+                spans.add(metrics.TOTAL, spans.origin, time.perf_counter())
+                result.spans = spans.items
+                self._record_spans(spans, modelName, attempts)
+            if self.on_response is not None:
+                try:
+                    self.on_response(result)
+                except Exception as e:
+                    logger.error(f"In on_response: {e}")
+            return result
+
+    def stream_ask(self, message: str, **kwargs: Any) -> Iterator[Union[ImageProgress, GrokResponse]]:
+        """
+        Same as ask(), but yields ImageProgress frames while images are being generated.
+        The last item is always the final GrokResponse.
+        """
+        events: "queue.Queue" = queue.Queue()
+
+        def run():
+            try:
+                events.put(self.ask(message, on_image_progress=events.put, **kwargs))
+            except BaseException as e:
+                events.put(e)
+
+        worker = threading.Thread(target=run, name="grok3api-stream-ask", daemon=True)
+        worker.start()
+        while True:
+            event = events.get()
+            if isinstance(event, BaseException):
+                raise event
+            yield event
+            if isinstance(event, GrokResponse):
+                return
+
+    async def async_stream_ask(self, message: str, **kwargs: Any) -> AsyncIterator[Union[ImageProgress, GrokResponse]]:
+        """Asynchronous version of stream_ask."""
+        loop = asyncio.get_running_loop()
+        events: "asyncio.Queue" = asyncio.Queue()
+        task = asyncio.ensure_future(self.async_ask(
+            message, on_image_progress=lambda progress: loop.call_soon_threadsafe(events.put_nowait, progress), **kwargs))
+
+        def forward(done: asyncio.Future):
+            if done.cancelled():
+                events.put_nowait(asyncio.CancelledError())
+            else:
+                events.put_nowait(done.exception() or done.result())
+
+        task.add_done_callback(forward)
+        try:
+            while True:
+                event = await events.get()
+                if isinstance(event, BaseException):
+                    raise event
+                yield event
+                if isinstance(event, GrokResponse):
+                    return
+        finally:
+            if not task.done():
+                task.cancel()
+
+    @staticmethod
+    def _batch_item(item: Union[str, Tuple[str, Dict[str, Any]], Dict[str, Any]],
+                    common_kwargs: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Splits a prompt of ask_many() into the message and the ask() arguments."""
+        kwargs = dict(common_kwargs)
+        if isinstance(item, str):
+            message = item
+        elif isinstance(item, dict):
+            item = dict(item)
+            message = item.pop("message")
+            kwargs.update(item)
+        else:
+            message, item_kwargs = item
+            kwargs.update(item_kwargs or {})
+        kwargs.setdefault("new_conversation", True)
+        return message, kwargs
+
+    def _ask_item(self, index: int, item: Any, common_kwargs: Dict[str, Any],
+                  retries: int, retry_delay: float) -> BatchResult:
+        started = time.monotonic()
+        try:
+            message, kwargs = self._batch_item(item, common_kwargs)
+        except Exception as e:
+            return BatchResult(index=index, message=str(item), error=f"Invalid prompt: {e}")
+        result = BatchResult(index=index, message=message, kwargs=kwargs)
+        for attempt in range(1, retries + 2):
+            result.attempts = attempt
+            try:
+                with self._own_conversation():
+                    result.response = self.ask(message, **kwargs)
+                result.error = result.response.error
+            except Exception as e:
+                result.response, result.error = None, str(e)
+            if result.error is None:
+                break
+            if attempt <= retries:
+                logger.debug(f"ask_many: prompt {index} failed ({result.error}), retrying")
+                time.sleep(retry_delay * attempt)
+        result.elapsed = time.monotonic() - started
+        return result
+
+    async def _async_ask_item(self, index: int, item: Any, common_kwargs: Dict[str, Any],
+                              retries: int, retry_delay: float) -> BatchResult:
+        started = time.monotonic()
+        try:
+            message, kwargs = self._batch_item(item, common_kwargs)
+        except Exception as e:
+            return BatchResult(index=index, message=str(item), error=f"Invalid prompt: {e}")
+        result = BatchResult(index=index, message=message, kwargs=kwargs)
+        for attempt in range(1, retries + 2):
+            result.attempts = attempt
+            try:
+                with self._own_conversation():
+                    result.response = await self.async_ask(message, **kwargs)
+                result.error = result.response.error
+            except Exception as e:
+                result.response, result.error = None, str(e)
+            if result.error is None:
+                break
+            if attempt <= retries:
+                logger.debug(f"async_ask_many: prompt {index} failed ({result.error}), retrying")
+                await asyncio.sleep(retry_delay * attempt)
+        result.elapsed = time.monotonic() - started
+        return result
+
+    def ask_many(self,
+                 prompts: Iterable[Union[str, Tuple[str, Dict[str, Any]], Dict[str, Any]]],
+                 concurrency: int = 4,
+                 ordered: bool = False,
+                 retries: int = 0,
+                 retry_delay: float = 2.0,
+                 on_progress: Optional[Callable[[int, Optional[int], BatchResult], Any]] = None,
+                 **kwargs: Any) -> Iterator[BatchResult]:
+        """
+        Runs many prompts with at most `concurrency` requests in flight and yields a BatchResult for each of them.
+
+        Args:
+            prompts: Messages, `(message, kwargs)` tuples or dicts with a "message" key and ask() arguments.
+                Read lazily, so it can be a generator. Every prompt runs in a conversation of its own:
+                the client's conversationId and parentResponseId are neither used nor changed.
+            concurrency (int): Maximum number of concurrent requests. Must be positive. Defaults to 4.
+            ordered (bool): Yield results in input order instead of as they complete. Defaults to False.
+            retries (int): How many more times a failed prompt is run through ask(). Every ask() already retries
+                up to the client's retry_policy, so each retry here multiplies those attempts. Defaults to 0.
+            retry_delay (float): Delay before a retry in seconds, multiplied by the attempt number. Defaults to 2.
+            on_progress (Callable[[int, Optional[int], BatchResult], Any]): Called with (done, total, result) after every prompt. total is None if prompts has no length.
+            **kwargs: ask() arguments shared by all prompts.
+
+        A failed prompt never stops the batch: its BatchResult has `error` set.
+        """
+        if concurrency <= 0:
+            raise ValueError("concurrency must be positive")
+        total = len(prompts) if hasattr(prompts, "__len__") else None
+        items = enumerate(prompts)
+        max_buffered = concurrency * 4
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="grok3api-batch")
+        pending: Dict[Future, int] = {}
+        finished: Dict[int, BatchResult] = {}
+        next_index = 0
+        done = 0
+
+        def fill():
+            while len(pending) < concurrency and not (ordered and len(finished) >= max_buffered):
+                item = next(items, None)
+                if item is None:
+                    return
+                pending[executor.submit(self._ask_item, item[0], item[1], kwargs, retries, retry_delay)] = item[0]
+
+        try:
+            fill()
+            while pending:
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    del pending[future]
+                    result = future.result()
+                    done += 1
+                    if on_progress is not None:
+                        try:
+                            on_progress(done, total, result)
+                        except Exception as e:
+                            logger.error(f"In ask_many on_progress: {e}")
+                    if ordered:
+                        finished[result.index] = result
+                    else:
+                        yield result
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+                fill()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def async_ask_many(self,
+                             prompts: Union[Iterable[Any], AsyncIterable[Any]],
+                             concurrency: int = 4,
+                             ordered: bool = False,
+                             retries: int = 0,
+                             retry_delay: float = 2.0,
+                             on_progress: Optional[Callable[[int, Optional[int], BatchResult], Any]] = None,
+                             **kwargs: Any) -> AsyncIterator[BatchResult]:
+        """Asynchronous version of ask_many. prompts can also be an async iterable, on_progress a coroutine function."""
+        if concurrency <= 0:
+            raise ValueError("concurrency must be positive")
+        total = len(prompts) if hasattr(prompts, "__len__") else None
+        if hasattr(prompts, "__aiter__"):
+            next_prompt = prompts.__aiter__().__anext__
+        else:
+            sync_iterator = iter(prompts)
+
+            async def next_prompt():
+                try:
+                    return next(sync_iterator)
+                except StopIteration:
+                    raise StopAsyncIteration
+
+        max_buffered = concurrency * 4
+        pending: Dict[asyncio.Task, int] = {}
+        finished: Dict[int, BatchResult] = {}
+        index = 0
+        next_index = 0
+        done = 0
+        exhausted = False
+
+        async def fill():
+            nonlocal index, exhausted
+            while not exhausted and len(pending) < concurrency and not (ordered and len(finished) >= max_buffered):
+                try:
+                    item = await next_prompt()
+                except StopAsyncIteration:
+                    exhausted = True
+                    return
+                task = asyncio.ensure_future(self._async_ask_item(index, item, kwargs, retries, retry_delay))
+                pending[task] = index
+                index += 1
+
+        try:
+            await fill()
+            while pending:
+                completed, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in completed:
+                    del pending[task]
+                    result = task.result()
+                    done += 1
+                    if on_progress is not None:
+                        try:
+                            callback_result = on_progress(done, total, result)
+                            if inspect.isawaitable(callback_result):
+                                await callback_result
+                        except Exception as e:
+                            logger.error(f"In async_ask_many on_progress: {e}")
+                    if ordered:
+                        finished[result.index] = result
+                    else:
+                        yield result
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+                await fill()
+        finally:
+            for task in pending:
+                task.cancel()
 
     def handle_str_error(self, response_str):
         try:
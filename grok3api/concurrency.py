@@ -0,0 +1,145 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from grok3api.logger import logger
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution (for threads).
+    The first caller runs the function, the others wait for it and get the same result or the same exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            logger.debug(f"Joined an in-flight request ({call.waiters} waiting)")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    Asyncio version of SingleFlight. The shared call runs as its own task:
+    a cancelled waiter leaves it running for the others, and it is cancelled only when nobody waits for it any more.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        flight_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(flight_key)
+        if task is None or task.done():
+            # A finished or abandoned flight is never joined: its result may be a cancellation nobody asked for.
+            task = self._tasks[flight_key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda done: self._forget(flight_key, done))
+        else:
+            logger.debug(f"Joined an in-flight request ({self._waiters.get(task, 0)} waiting)")
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters.get(task) == 1 and not task.done():
+                if self._tasks.get(flight_key) is task:
+                    del self._tasks[flight_key]
+                task.cancel()
+            raise
+        finally:
+            remaining = self._waiters.get(task, 1) - 1
+            if remaining > 0:
+                self._waiters[task] = remaining
+            else:
+                self._waiters.pop(task, None)
+
+    def _forget(self, flight_key: Tuple[int, str], task: asyncio.Future):
+        if self._tasks.get(flight_key) is task:
+            del self._tasks[flight_key]
+        if not task.cancelled():
+            task.exception()  # waiters get it through shield(); this only marks it as retrieved
+
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+
+class RequestHandle:
+    """
+    Cancels a running ask() from another thread: pass it as `handle` and call cancel().
+    The fetch in the page is aborted right away, so the browser does not keep waiting for a response nobody reads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._aborts: Dict[str, Callable[[], None]] = {}
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled.set()
+            aborts = list(self._aborts.values())
+            self._aborts.clear()
+        for abort in aborts:
+            try:
+                abort()
+            except Exception as e:
+                logger.debug(f"In RequestHandle.cancel: {e}")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleeps up to `timeout` seconds; returns True as soon as the handle is cancelled."""
+        return self._cancelled.wait(timeout)
+
+    def attach(self, key: str, abort: Callable[[], None]) -> bool:
+        """Registers how to abort a part of the request. Returns False, registering nothing, if it is cancelled already."""
+        with self._lock:
+            if self._cancelled.is_set():
+                return False
+            self._aborts[key] = abort
+            return True
+
+    def detach(self, key: str):
+        with self._lock:
+            self._aborts.pop(key, None)
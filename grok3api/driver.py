@@ -1,7 +1,13 @@
+import fnmatch
+import json
 import logging
 import re
+import tempfile
+import threading
 import time
-from typing import Optional
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Optional, List, Tuple
 import os
 import shutil
 import subprocess
@@ -17,7 +23,22 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as ec
 from selenium.common.exceptions import SessionNotCreatedException
 
-from grok3api.logger import logger
+from grok3api.logger import logger, debug_event
+from grok3api.proxies import ProxyPool
+
+
+class CookieSnapshot:
+    """
+    Cookies of one browser session, shared by all objects created during it.
+    They are read from the browser only when that session is about to end (restart or close),
+    and only if some object still holds the snapshot, so creating objects costs no browser round trips.
+    """
+    __slots__ = ("epoch", "cookies", "__weakref__")
+
+    def __init__(self, epoch: int):
+        self.epoch = epoch
+        self.cookies: Optional[List[dict]] = None
+
 
 class WebDriverSingleton:
     """Singleton for managing ChromeDriver."""
@@ -29,9 +50,33 @@ class WebDriverSingleton:
     xvfb_display: Optional[int] = None
 
     BASE_URL = "https://grok.com/"
+    ASSETS_URL = "https://assets.grok.com"
     CHROME_VERSION = None
     WAS_FATAL = False
     def_proxy = "socks4://68.71.252.38:4145"
+    proxy_pool: Optional[ProxyPool] = None
+
+    PROFILE_DIR: Optional[str] = None
+    SNAPSHOT_PATH: Optional[str] = None
+    SNAPSHOT_MAX_AGE = 12 * 60 * 60
+    SNAPSHOT_VERSION = 1
+
+    DEFAULT_BLOCKED_URLS = [
+        "*.woff", "*.woff2", "*.ttf", "*.otf",
+        "*.mp4", "*.webm", "*.mp3", "*.ogg", "*.wav",
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+        "*sentry.io*", "*/_next/image*",
+    ]
+    BLOCK_PROTECTED_URLS = [
+        "https://challenges.cloudflare.com/turnstile/v0/api.js",
+        "https://grok.com/cdn-cgi/challenge-platform/h/b/orchestrate/chl_page/v1",
+        "https://grok.com/_next/static/chunks/main.js",
+        "https://grok.com/rest/app-chat/conversations/new",
+        "https://grok.com/favicon.ico",
+        "https://assets.grok.com/users/0/generated/0/image.jpg",
+    ]
+    BLOCKED_URLS: List[str] = []
+    last_page_load: Optional[float] = None
 
     execute_script = None
     add_cookie = None
@@ -44,6 +89,23 @@ class WebDriverSingleton:
         return cls._instance
 
     def __init__(self):
+        self._state = threading.Condition()
+        self._in_flight = 0
+        self._recycle_reason: Optional[str] = None
+        self._recycle_healthy = True
+        self._recycling = False
+        self._recovering = 0
+        self._last_proxy: Optional[str] = None
+        self._window_lock = threading.RLock()
+        self._assets_handle: Optional[str] = None
+        self.cookie_epoch = 0
+        self._cookie_snapshot: Optional[weakref.ref] = None
+        self._cookies_restored_from: Optional[Tuple[int, Optional[int]]] = None
+        self.generation = 0
+        self.started_at = 0.0
+        self.request_count = 0
+        self.error_count = 0
+
         self._hide_unnecessary_logs()
         self._patch_chrome_del()
         atexit.register(self.close_driver)
@@ -100,8 +162,12 @@ class WebDriverSingleton:
             return False
 
     def _setup_driver(self, driver, wait_loading: bool, timeout: int):
-        """Sets up the driver: minimizes, loads the base URL, and waits for the input field."""
+        """Sets up the driver: minimizes, applies the block list, restores the session snapshot, loads the base URL, and waits for the input field."""
         self._minimize()
+        self._apply_blocked_urls(driver)
+        if self.SNAPSHOT_PATH and not self.PROFILE_DIR:
+            self._restore_session_snapshot(driver)
+        started = time.monotonic()
         driver.get(self.BASE_URL)
         if wait_loading:
             logger.debug("Waiting for page load with implicit wait...")
@@ -109,23 +175,165 @@ class WebDriverSingleton:
                 WebDriverWait(driver, timeout).until(
                     ec.presence_of_element_located((By.CSS_SELECTOR, "div.relative.z-10 textarea"))
                 )
+                self._record_page_load(started, "Browser setup")
                 time.sleep(2)
                 logger.debug("Input field found.")
+                self.save_session_snapshot()
             except Exception:
                 logger.debug("Input field not found")
 
-    def init_driver(self, wait_loading: bool = True, use_xvfb: bool = True, timeout: Optional[int] = None, proxy: Optional[str] = None):
-        """Starts ChromeDriver and checks/sets the base URL with three attempts."""
+    def _validate_blocked_urls(self, patterns: List[str]) -> List[str]:
+        """Drops patterns that would block anti-bot challenge scripts, the app itself, the API, or generated images."""
+        valid = []
+        for pattern in patterns:
+            protected = [url for url in self.BLOCK_PROTECTED_URLS if fnmatch.fnmatchcase(url, pattern)]
+            if protected:
+                logger.warning(f"Blocked URL pattern {pattern!r} ignored: it matches {protected[0]}")
+            else:
+                valid.append(pattern)
+        return valid
+
+    def set_blocked_urls(self, patterns: Optional[List[str]]):
+        """
+        Sets URL patterns the browser must not load (fonts, media, analytics, ...) via CDP Network.setBlockedURLs.
+        Patterns that would break anti-bot checks or the API are ignored. Pass None or [] to disable blocking.
+        """
+        self.BLOCKED_URLS = self._validate_blocked_urls(patterns or [])
+        if self._driver:
+            self._apply_blocked_urls(self._driver)
+
+    def _apply_blocked_urls(self, driver):
+        """Sends the current block list to the browser."""
+        try:
+            if not self.BLOCKED_URLS and not getattr(driver, "_grok3api_blocking", False):
+                return
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.BLOCKED_URLS})
+            driver._grok3api_blocking = bool(self.BLOCKED_URLS)
+            logger.debug(f"Blocking {len(self.BLOCKED_URLS)} URL patterns.")
+        except Exception as e:
+            logger.debug(f"Error while applying the URL block list: {e}")
+
+    def _record_page_load(self, started: float, label: str):
+        """Saves and logs how long loading grok.com took, so the effect of the block list can be measured."""
+        self.last_page_load = time.monotonic() - started
+        debug_event(f"{label}: page loaded", seconds=round(self.last_page_load, 2),
+                    blocked_patterns=len(self.BLOCKED_URLS))
+
+    def _load_session_snapshot(self, user_agent: str) -> Optional[dict]:
+        """Reads the snapshot file and returns it only if it is valid, fresh, and made by the same browser."""
+        try:
+            with open(self.SNAPSHOT_PATH, "r", encoding="utf-8") as file:
+                snapshot = json.load(file)
+        except FileNotFoundError:
+            logger.debug("Session snapshot not found, starting cold.")
+            return None
+        except Exception as e:
+            logger.debug(f"Session snapshot is unreadable, ignoring it: {e}")
+            return None
+
+        if not isinstance(snapshot, dict) or snapshot.get("version") != self.SNAPSHOT_VERSION:
+            logger.debug("Session snapshot has an unsupported format, ignoring it.")
+            return None
+        age = time.time() - snapshot.get("saved_at", 0)
+        if age > self.SNAPSHOT_MAX_AGE:
+            logger.debug(f"Session snapshot is too old ({int(age)} sec), ignoring it.")
+            return None
+        if snapshot.get("user_agent") != user_agent:
+            logger.debug("Session snapshot was made by another browser version, ignoring it.")
+            return None
+
+        now = time.time()
+        cookies = [cookie for cookie in snapshot.get("cookies", [])
+                   if isinstance(cookie, dict) and "name" in cookie and "value" in cookie
+                   and cookie.get("expiry", now + 1) > now]
+        if not cookies:
+            logger.debug("All cookies in the session snapshot have expired, ignoring it.")
+            return None
+        snapshot["cookies"] = cookies
+        return snapshot
+
+    def _restore_session_snapshot(self, driver) -> bool:
+        """Restores cookies and localStorage from the snapshot so the browser starts warm."""
+        try:
+            driver.get(self.BASE_URL + "favicon.ico")
+            snapshot = self._load_session_snapshot(driver.execute_script("return navigator.userAgent;"))
+            if snapshot is None:
+                return False
+
+            restored = 0
+            for cookie in snapshot["cookies"]:
+                try:
+                    driver.add_cookie(cookie)
+                    restored += 1
+                except Exception as e:
+                    logger.debug(f"Skipped cookie {cookie.get('name')} from the snapshot: {e}")
+            local_storage = snapshot.get("local_storage") or {}
+            if local_storage:
+                driver.execute_script(
+                    "const data = arguments[0]; for (const key in data) { localStorage.setItem(key, data[key]); }",
+                    local_storage)
+            logger.debug(f"Session snapshot restored: {restored} cookies, {len(local_storage)} localStorage keys.")
+            return restored > 0
+        except Exception as e:
+            logger.debug(f"Error while restoring the session snapshot: {e}")
+            return False
+
+    def save_session_snapshot(self) -> bool:
+        """Exports cookies and localStorage of the current session to SNAPSHOT_PATH."""
+        if not self.SNAPSHOT_PATH or not self._driver:
+            return False
+        with self._window_lock:
+            try:
+                if not self._driver.current_url.startswith(self.BASE_URL):
+                    return False
+                snapshot = {
+                    "version": self.SNAPSHOT_VERSION,
+                    "saved_at": time.time(),
+                    "user_agent": self._driver.execute_script("return navigator.userAgent;"),
+                    "cookies": self._driver.get_cookies(),
+                    "local_storage": self._driver.execute_script("return Object.assign({}, localStorage);"),
+                }
+                directory = os.path.dirname(os.path.abspath(self.SNAPSHOT_PATH))
+                os.makedirs(directory, exist_ok=True)
+                with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, delete=False) as file:
+                    json.dump(snapshot, file, ensure_ascii=False)
+                os.replace(file.name, self.SNAPSHOT_PATH)
+                logger.debug(f"Session snapshot saved to {self.SNAPSHOT_PATH}.")
+                return True
+            except Exception as e:
+                logger.debug(f"Error while saving the session snapshot: {e}")
+                return False
+
+    def init_driver(self, wait_loading: bool = True, use_xvfb: bool = True, timeout: Optional[int] = None, proxy: Optional[str] = None,
+                    profile_dir: Optional[str] = None, snapshot_path: Optional[str] = None,
+                    blocked_urls: Optional[List[str]] = None):
+        """Starts ChromeDriver and checks/sets the base URL with three attempts.
+
+        :param profile_dir: Persistent Chrome profile directory. Replaces incognito mode, so anti-bot clearance survives restarts.
+        :param snapshot_path: File for the cookie/localStorage snapshot restored when a new browser is started.
+        :param blocked_urls: URL patterns (with `*` wildcards) the browser must not load. See set_blocked_urls.
+        """
         driver_timeout = timeout if timeout is not None else self.TIMEOUT
 
         self.USE_XVFB = use_xvfb
+        if profile_dir is not None:
+            self.PROFILE_DIR = profile_dir
+        if snapshot_path is not None:
+            self.SNAPSHOT_PATH = snapshot_path
+        if blocked_urls is not None:
+            self.BLOCKED_URLS = self._validate_blocked_urls(blocked_urls)
+        if proxy is None and self.proxy_pool is not None:
+            proxy = self.proxy_pool.choose()
+        self._last_proxy = proxy
         attempts = 0
         max_attempts = 3
 
         def _create_driver():
             chrome_options = Options()
             chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--incognito")
+            if not self.PROFILE_DIR:
+                chrome_options.add_argument("--incognito")
             chrome_options.add_argument("--disable-blink-features=AutomationControlled")
             chrome_options.add_argument("--disable-gpu")
             chrome_options.add_argument("--disable-dev-shm-usage")
@@ -133,7 +341,10 @@ class WebDriverSingleton:
                 logger.debug(f"Adding proxy to options: {proxy}")
                 chrome_options.add_argument(f"--proxy-server={proxy}")
 
-            new_driver = uc.Chrome(options=chrome_options, headless=False, use_subprocess=True, version_main=self.CHROME_VERSION)
+            if self.PROFILE_DIR:
+                os.makedirs(self.PROFILE_DIR, exist_ok=True)
+            new_driver = uc.Chrome(options=chrome_options, headless=False, use_subprocess=True,
+                                   version_main=self.CHROME_VERSION, user_data_dir=self.PROFILE_DIR)
             new_driver.set_script_timeout(driver_timeout)
             return new_driver
 
@@ -161,31 +372,32 @@ class WebDriverSingleton:
                     self.WAS_FATAL = False
                     logger.debug("Driver is alive, all good.")
 
-                    self.execute_script = self._driver.execute_script
-                    self.add_cookie = self._driver.add_cookie
-                    self.get_cookies = self._driver.get_cookies
-                    self.get = self._driver.get
+                    self.execute_script = self._in_main_window(self._driver.execute_script)
+                    self.add_cookie = self._in_main_window(self._driver.add_cookie)
+                    self.get_cookies = self._in_main_window(self._driver.get_cookies)
+                    self.get = self._in_main_window(self._driver.get)
 
                     return
 
                 logger.debug(f"Attempt {attempts + 1}: creating new driver...")
 
-                self.close_driver()
+                self.close_driver(save_snapshot=False)
                 self._driver = _create_driver()
+                self._on_new_browser()
                 self._setup_driver(self._driver, wait_loading, driver_timeout)
                 self.WAS_FATAL = False
 
                 logger.debug("Browser started")
 
-                self.execute_script = self._driver.execute_script
-                self.add_cookie = self._driver.add_cookie
-                self.get_cookies = self._driver.get_cookies
-                self.get = self._driver.get
+                self.execute_script = self._in_main_window(self._driver.execute_script)
+                self.add_cookie = self._in_main_window(self._driver.add_cookie)
+                self.get_cookies = self._in_main_window(self._driver.get_cookies)
+                self.get = self._in_main_window(self._driver.get)
 
                 return
 
             except SessionNotCreatedException as e:
-                self.close_driver()
+                self.close_driver(save_snapshot=False)
                 error_message = str(e)
                 match = re.search(r"Current browser version is (\d+)", error_message)
                 if match:
@@ -195,18 +407,19 @@ class WebDriverSingleton:
                 self.CHROME_VERSION = current_version
                 logger.info(f"Browser and driver incompatibility, attempting to reinstall driver for Chrome {self.CHROME_VERSION}...")
                 self._driver = _create_driver()
+                self._on_new_browser()
                 self._setup_driver(self._driver, wait_loading, driver_timeout)
                 logger.info(f"Successfully set driver version to {self.CHROME_VERSION}.")
                 self.WAS_FATAL = False
 
-                self.execute_script = self._driver.execute_script
-                self.add_cookie = self._driver.add_cookie
+                self.execute_script = self._in_main_window(self._driver.execute_script)
+                self.add_cookie = self._in_main_window(self._driver.add_cookie)
                 return
 
             except Exception as e:
                 logger.error(f"In attempt {attempts + 1}: {e}")
                 attempts += 1
-                self.close_driver()
+                self.close_driver(save_snapshot=False)
                 if attempts == max_attempts:
                     logger.fatal(f"All {max_attempts} attempts failed: {e}")
                     self.WAS_FATAL = True
@@ -214,76 +427,371 @@ class WebDriverSingleton:
                 logger.debug("Waiting 1 second before next attempt...")
                 time.sleep(1)
 
-    def restart_session(self):
-        """Restarts the session, clearing cookies, localStorage, sessionStorage, and reloading the page."""
+    def _on_new_browser(self):
+        """Resets per-browser statistics after a new browser has been started."""
+        self.generation += 1
+        self.cookie_epoch += 1
+        self._assets_handle = None
+        self.started_at = time.monotonic()
+        self.request_count = 0
+        self.error_count = 0
+
+    def _in_main_window(self, func):
+        """Wraps a driver method so it never runs while a background tab is active."""
+        def call(*args, **kwargs):
+            with self._window_lock:
+                return func(*args, **kwargs)
+        return call
+
+    def execute_on_origin(self, origin_url: str, script: str, *args):
+        """
+        Runs a script in a background tab that stays on origin_url's origin.
+        The tab is opened and navigated once per browser; later calls only switch to it,
+        so the grok.com page in the main tab is never navigated away.
+        """
+        with self._window_lock:
+            main_handle = self._driver.current_window_handle
+            if self._assets_handle is None or self._assets_handle not in self._driver.window_handles:
+                debug_event("Opening a background tab", origin=origin_url)
+                self._driver.switch_to.new_window("tab")
+                self._assets_handle = self._driver.current_window_handle
+                try:
+                    self._driver.get(origin_url)
+                except Exception:
+                    self._driver.switch_to.window(main_handle)
+                    raise
+            else:
+                self._driver.switch_to.window(self._assets_handle)
+            try:
+                return self._driver.execute_script(script, *args)
+            finally:
+                self._driver.switch_to.window(main_handle)
+
+    def ensure_cookies(self, cookies: Optional[List[dict]], source_epoch: Optional[int]):
+        """
+        Re-adds cookies captured from an earlier browser session. Does nothing if they were captured in the
+        current session or were already restored into it, so cookies are set at most once per session.
+        """
+        if not cookies or source_epoch == self.cookie_epoch:
+            return
+        with self._window_lock:
+            if self._cookies_restored_from == (self.cookie_epoch, source_epoch):
+                return
+            for cookie in cookies:
+                if 'name' in cookie and 'value' in cookie:
+                    cookie = cookie.copy()
+                    if not cookie.get('domain'):
+                        cookie['domain'] = '.grok.com'
+                    try:
+                        self._driver.add_cookie(cookie)
+                    except Exception as e:
+                        debug_event("Skipped cookie", name=cookie.get('name'), error=e)
+                else:
+                    logger.warning(f"Skipped invalid cookie: {cookie}")
+            self._cookies_restored_from = (self.cookie_epoch, source_epoch)
+            debug_event("Restored cookies from a previous browser session", count=len(cookies))
+
+    def cookie_snapshot(self) -> CookieSnapshot:
+        """Returns the shared cookie snapshot of the current browser session without touching the browser."""
+        snapshot = self._cookie_snapshot() if self._cookie_snapshot is not None else None
+        if snapshot is None or snapshot.epoch != self.cookie_epoch:
+            snapshot = CookieSnapshot(self.cookie_epoch)
+            self._cookie_snapshot = weakref.ref(snapshot)
+        return snapshot
+
+    def _capture_cookie_snapshot(self):
+        """Reads cookies into the snapshot of the ending session, if anything still refers to it."""
+        snapshot = self._cookie_snapshot() if self._cookie_snapshot is not None else None
+        self._cookie_snapshot = None
+        if snapshot is None or snapshot.cookies is not None or snapshot.epoch != self.cookie_epoch:
+            return
         try:
-            self._driver.delete_all_cookies()
-            self._driver.execute_script("localStorage.clear();")
-            self._driver.execute_script("sessionStorage.clear();")
-            self._driver.get(self.BASE_URL)
-            WebDriverWait(self._driver, 5).until(
-                ec.presence_of_element_located((By.CSS_SELECTOR, "div.relative.z-10 textarea"))
-            )
-            time.sleep(2)
-            logger.debug("Page loaded, session refreshed.")
+            with self._window_lock:
+                snapshot.cookies = self._driver.get_cookies()
+            debug_event("Captured cookies of the ending browser session", count=len(snapshot.cookies))
         except Exception as e:
-            logger.debug(f"Error during session restart: {e}")
+            logger.debug(f"Could not capture cookies of the ending browser session: {e}")
+
+    def begin_request(self):
+        """Marks the start of a request. Waits for a pending recycle, or performs it if the browser is idle."""
+        with self._state:
+            while self._recycling or self._recovering:
+                self._state.wait()
+            if self._recycle_reason is not None:
+                while self._in_flight > 0 or self._recycling:
+                    self._state.wait()
+                if self._recycle_reason is not None:
+                    self._recycle_locked()
+            self._in_flight += 1
+
+    def end_request(self, success: bool = True):
+        """Marks the end of a request started with begin_request."""
+        with self._state:
+            self._in_flight = max(self._in_flight - 1, 0)
+            self.request_count += 1
+            if not success:
+                self.error_count += 1
+            self._state.notify_all()
+
+    @contextmanager
+    def request_slot(self):
+        """Context manager around begin_request/end_request; an exception counts as a failed request."""
+        self.begin_request()
+        success = False
+        try:
+            yield
+            success = True
+        finally:
+            self.end_request(success)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests currently using the browser."""
+        return self._in_flight
+
+    def request_recycle(self, reason: str, healthy: bool = True):
+        """
+        Schedules a browser restart that will happen as soon as no request is using it.
+        The session snapshot is saved on the way only if `healthy` (e.g. not after a run of errors).
+        """
+        with self._state:
+            if self._recycle_reason is None:
+                debug_event("Browser recycle requested", reason=reason)
+                self._recycle_reason = reason
+                self._recycle_healthy = healthy
+
+    def recover(self, action: Callable[[], Any], since_epoch: Optional[int] = None) -> bool:
+        """
+        Runs a recovery action (session restart, browser restart, proxy change) once no other request is using
+        the browser, so it never reloads the page under a request that is still streaming.
+        Must be called inside a request (between begin_request and end_request): the caller's slot is given back
+        while it waits and taken again afterwards. New requests wait until the action is done.
+        If the session has changed since `since_epoch` (another request has recovered it meanwhile),
+        the action is skipped. Returns True if it ran.
+        """
+        with self._state:
+            self._in_flight = max(self._in_flight - 1, 0)
+            self._recovering += 1
+            self._state.notify_all()
+            try:
+                while self._in_flight > 0 or self._recycling:
+                    self._state.wait()
+                if since_epoch is not None and since_epoch != self.cookie_epoch:
+                    debug_event("Recovery skipped, the session was already reset")
+                    return False
+                self._recycling = True
+                self._state.release()
+                try:
+                    action()
+                finally:
+                    self._state.acquire()
+                    self._recycling = False
+                return True
+            finally:
+                self._recovering -= 1
+                self._in_flight += 1
+                self._state.notify_all()
+
+    def recycle_if_idle(self) -> bool:
+        """Performs a pending recycle right away if no request is in flight."""
+        with self._state:
+            if self._recycle_reason is None or self._in_flight > 0 or self._recycling:
+                return False
+            self._recycle_locked()
+            return True
+
+    def _recycle_locked(self):
+        """Restarts the browser. Must be called with self._state held and no requests in flight."""
+        reason = self._recycle_reason
+        self._recycling = True
+        self._state.release()
+        try:
+            logger.info(f"Recycling the browser ({reason}).")
+            self.close_driver(save_snapshot=self._recycle_healthy)
+            # With a proxy pool the new browser gets the best proxy at the moment instead of the old one.
+            self.init_driver(use_xvfb=self.USE_XVFB, timeout=self.TIMEOUT,
+                             proxy=self._last_proxy if self.proxy_pool is None else None)
+        except Exception as e:
+            logger.error(f"Error while recycling the browser: {e}")
+        finally:
+            self._state.acquire()
+            self._recycling = False
+            self._recycle_reason = None
+            self._recycle_healthy = True
+            self._state.notify_all()
+
+    def get_memory_usage(self, js_heap: bool = True) -> dict:
+        """
+        Returns renderer JS heap size (via CDP) and browser process tree RSS in megabytes, where available.
+        With js_heap=False only the RSS is read, without a command to the browser.
+        """
+        usage = {}
+        if not self._driver:
+            return usage
+        if js_heap:
+            try:
+                self._driver.execute_cdp_cmd("Performance.enable", {})
+                metrics = self._driver.execute_cdp_cmd("Performance.getMetrics", {}).get("metrics", [])
+                for metric in metrics:
+                    if metric.get("name") == "JSHeapTotalSize":
+                        usage["js_heap_mb"] = metric.get("value", 0) / (1024 * 1024)
+            except Exception as e:
+                logger.debug(f"Error while reading browser performance metrics: {e}")
+        pid = getattr(self._driver, "browser_pid", None)
+        if pid:
+            rss = self._process_tree_rss(pid)
+            if rss is not None:
+                usage["rss_mb"] = rss / (1024 * 1024)
+        return usage
+
+    @staticmethod
+    def _process_tree_rss(pid: int) -> Optional[int]:
+        """Sums the resident memory of a process and all of its children, in bytes."""
+        try:
+            import psutil
+            root = psutil.Process(pid)
+            total = root.memory_info().rss
+            for child in root.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total
+        except ImportError:
+            pass
+        except Exception:
+            return None
+
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            children = {}
+            for entry in os.listdir("/proc"):
+                if not entry.isdigit():
+                    continue
+                try:
+                    with open(f"/proc/{entry}/stat", "r") as file:
+                        ppid = int(file.read().rsplit(")", 1)[1].split()[1])
+                    children.setdefault(ppid, []).append(int(entry))
+                except (OSError, IndexError, ValueError):
+                    continue
+            total, stack = 0, [pid]
+            page_size = os.sysconf("SC_PAGE_SIZE")
+            while stack:
+                current = stack.pop()
+                try:
+                    with open(f"/proc/{current}/statm", "r") as file:
+                        total += int(file.read().split()[1]) * page_size
+                except (OSError, IndexError, ValueError):
+                    pass
+                stack.extend(children.get(current, []))
+            return total
+        except Exception:
+            return None
+
+    def restart_session(self):
+        """Restarts the session, clearing cookies, localStorage, sessionStorage, and reloading the page."""
+        with self._window_lock:
+            try:
+                self._capture_cookie_snapshot()
+                self.cookie_epoch += 1
+                self._driver.delete_all_cookies()
+                self._driver.execute_script("localStorage.clear();")
+                self._driver.execute_script("sessionStorage.clear();")
+                started = time.monotonic()
+                self._driver.get(self.BASE_URL)
+                WebDriverWait(self._driver, 5).until(
+                    ec.presence_of_element_located((By.CSS_SELECTOR, "div.relative.z-10 textarea"))
+                )
+                self._record_page_load(started, "Session restart")
+                time.sleep(2)
+                logger.debug("Page loaded, session refreshed.")
+            except Exception as e:
+                debug_event("Error during session restart", error=e)
 
     def set_cookies(self, cookies_input):
         """Sets cookies in the driver."""
         if cookies_input is None:
             return
-        current_url = self._driver.current_url
-        if not current_url.startswith("http"):
-            raise Exception("Before setting cookies, you must first open a website in the driver!")
-
-        if isinstance(cookies_input, str):
-            cookie_string = cookies_input.strip().rstrip(";")
-            cookies = cookie_string.split("; ")
-            for cookie in cookies:
-                if "=" not in cookie:
-                    continue
-                name, value = cookie.split("=", 1)
-                self._driver.add_cookie({
-                    "name": name,
-                    "value": value,
-                    "path": "/"
-                })
-        elif isinstance(cookies_input, dict):
-            if "name" in cookies_input and "value" in cookies_input:
-                cookie = cookies_input.copy()
-                cookie.setdefault("path", "/")
-                self._driver.add_cookie(cookie)
-            else:
-                for name, value in cookies_input.items():
+        with self._window_lock:
+            current_url = self._driver.current_url
+            if not current_url.startswith("http"):
+                raise Exception("Before setting cookies, you must first open a website in the driver!")
+
+            if isinstance(cookies_input, str):
+                cookie_string = cookies_input.strip().rstrip(";")
+                cookies = cookie_string.split("; ")
+                for cookie in cookies:
+                    if "=" not in cookie:
+                        continue
+                    name, value = cookie.split("=", 1)
                     self._driver.add_cookie({
                         "name": name,
                         "value": value,
                         "path": "/"
                     })
-        elif isinstance(cookies_input, list):
-            for cookie in cookies_input:
-                if isinstance(cookie, dict) and "name" in cookie and "value" in cookie:
-                    cookie = cookie.copy()
+            elif isinstance(cookies_input, dict):
+                if "name" in cookies_input and "value" in cookies_input:
+                    cookie = cookies_input.copy()
                     cookie.setdefault("path", "/")
                     self._driver.add_cookie(cookie)
                 else:
-                    raise ValueError("Each dictionary in the list must contain 'name' and 'value'")
-        else:
-            raise TypeError("cookies_input must be a string, dictionary, or list of dictionaries")
-
-    def close_driver(self):
-        """Closes the driver."""
-        if self._driver:
-            self._driver.quit()
-            logger.debug("Browser closed.")
-        self._driver = None
+                    for name, value in cookies_input.items():
+                        self._driver.add_cookie({
+                            "name": name,
+                            "value": value,
+                            "path": "/"
+                        })
+            elif isinstance(cookies_input, list):
+                for cookie in cookies_input:
+                    if isinstance(cookie, dict) and "name" in cookie and "value" in cookie:
+                        cookie = cookie.copy()
+                        cookie.setdefault("path", "/")
+                        self._driver.add_cookie(cookie)
+                    else:
+                        raise ValueError("Each dictionary in the list must contain 'name' and 'value'")
+            else:
+                raise TypeError("cookies_input must be a string, dictionary, or list of dictionaries")
+            debug_event("Cookies set", kind=type(cookies_input).__name__)
+
+    def close_driver(self, save_snapshot: bool = True):
+        """
+        Closes the driver, saving the session snapshot first if it is enabled.
+        Pass save_snapshot=False when closing because of a challenge or an error,
+        so the next browser does not restore the session that just failed.
+        """
+        with self._window_lock:
+            if self._driver:
+                if self._is_driver_alive(self._driver):
+                    self._capture_cookie_snapshot()
+                    if self.SNAPSHOT_PATH and save_snapshot:
+                        self.save_session_snapshot()
+                self._driver.quit()
+                logger.debug("Browser closed.")
+            self._driver = None
+
+    @property
+    def current_proxy(self) -> Optional[str]:
+        """Proxy the current browser was started with."""
+        return self._last_proxy
 
     def set_proxy(self, proxy: str):
-        """Changes the proxy in the current driver session."""
+        """Changes the proxy in the current driver session.
+        With a proxy pool, the current proxy is reported as failed and the fastest healthy other one is used instead of `proxy`."""
+        if self.proxy_pool is not None:
+            self.proxy_pool.report_failure(self._last_proxy)
+            proxy = self.proxy_pool.choose(exclude=self._last_proxy) or proxy
         self.close_driver()
         self.init_driver(use_xvfb=self.USE_XVFB, timeout=self.TIMEOUT, proxy=proxy)
 
+    def set_proxy_pool(self, pool: Optional[ProxyPool]):
+        """Uses a ProxyPool for every browser started without an explicit proxy. Starts probing its proxies."""
+        if self.proxy_pool is not None and self.proxy_pool is not pool:
+            self.proxy_pool.stop()
+        self.proxy_pool = pool
+        if pool is not None:
+            pool.start()
+
     def _minimize(self):
         """Minimizes the browser window."""
         try:
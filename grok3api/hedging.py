@@ -0,0 +1,73 @@
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class HedgePolicy:
+    """
+    When to send a second copy of a request that has not received its first byte yet.
+
+    The first-byte latencies of recent requests are kept in a sliding window. A request that is still waiting
+    at the `percentile` of that window is sent again; the copy that answers first is used and the other one
+    is aborted in the page. Only requests that start a new conversation are hedged, since a second reply
+    to an existing conversation would fork it.
+
+    :param percentile: Percentile (0-100) of recent first-byte latencies after which a request is hedged.
+    :param window: Number of recent first-byte latencies kept.
+    :param min_samples: Requests are hedged only once this many latencies are known.
+    :param min_delay: Lower bound of the hedge delay in seconds.
+    :param max_ratio: Largest share of requests that may be hedged, so a slow Grok does not get twice the load.
+    """
+
+    def __init__(self,
+                 percentile: float = 95,
+                 window: int = 200,
+                 min_samples: int = 20,
+                 min_delay: float = 1.0,
+                 max_ratio: float = 0.1):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._requests = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+
+    def delay(self) -> Optional[float]:
+        """Seconds without a first byte after which a new request is hedged, or None while there are too few samples."""
+        with self._lock:
+            self._requests += 1
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+            rank = min(int(self.percentile / 100 * len(ordered)), len(ordered) - 1)
+            return max(ordered[rank], self.min_delay)
+
+    def allow(self) -> bool:
+        """Takes a hedge from the budget. False if `max_ratio` of the requests are hedged already."""
+        with self._lock:
+            if self._hedges + 1 > self.max_ratio * self._requests:
+                return False
+            self._hedges += 1
+            return True
+
+    def record(self, latency: float, hedge_won: bool = False):
+        """
+        Records the time from the start of a request to its first byte.
+        When the hedge won, this is the time until the hedge answered, a lower bound of the first request's latency.
+        """
+        with self._lock:
+            self._latencies.append(latency)
+            if hedge_won:
+                self._hedge_wins += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "hedged": self._hedges,
+                "hedge_wins": self._hedge_wins,
+                "samples": len(self._latencies),
+            }
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import time
+import urllib.request
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from grok3api.logger import logger
+from grok3api.scheduler import AdmissionScheduler, BATCH
+
+
+class JobQueueFull(Exception):
+    """Raised by JobQueue.submit when the queue already holds max_queue jobs."""
+
+
+@dataclass
+class Job:
+    """Request run in the background by JobQueue."""
+    message: str
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    webhook: Optional[str] = None
+    tenant: str = ""
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"  # queued, running, succeeded, failed
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """
+    Bounded queue of ask() requests processed by a fixed set of asyncio workers.
+    Finished jobs are kept for `result_ttl` seconds and then evicted.
+
+    :param client: GrokClient that runs the jobs.
+    :param workers: Number of jobs processed at the same time.
+    :param max_queue: Maximum number of jobs waiting to start.
+    :param result_ttl: Time in seconds a finished job stays available.
+    :param webhook_timeout: Timeout of the completion webhook call in seconds.
+    :param scheduler: AdmissionScheduler the jobs go through as batch requests of their tenant.
+    """
+
+    def __init__(self, client, workers: int = 2, max_queue: int = 100, result_ttl: float = 3600,
+                 webhook_timeout: float = 10, scheduler: Optional[AdmissionScheduler] = None):
+        self.client = client
+        self.scheduler = scheduler
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.webhook_timeout = webhook_timeout
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, message: str, webhook: Optional[str] = None, tenant: str = "", **kwargs: Any) -> Job:
+        """Queues a job and returns it immediately. Raises JobQueueFull if the queue is full."""
+        if self._queue is None:
+            raise RuntimeError("JobQueue is not started")
+        self._evict()
+        job = Job(message=message, kwargs=kwargs, webhook=webhook, tenant=tenant)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Job queue is full ({self.max_queue} jobs waiting)")
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._evict()
+        return self._jobs.get(job_id)
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _evict(self):
+        """Drops finished jobs older than result_ttl. Jobs are ordered by creation, so this stops at the first live one."""
+        deadline = time.time() - self.result_ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.finished_at < deadline:
+                del self._jobs[job_id]
+            elif job.created_at >= deadline:
+                break
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.error(f"In JobQueue worker: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            if self.scheduler is not None:
+                # Already bounded by this queue, so the job waits for a slot instead of being rejected.
+                async with self.scheduler.slot(job.tenant, BATCH, enforce_limit=False):
+                    response = await self.client.async_ask(job.message, **job.kwargs)
+            else:
+                response = await self.client.async_ask(job.message, **job.kwargs)
+            summary = response.summary()
+            job.result = summary._asdict()
+            if summary.error or not summary.message:
+                job.error = summary.error or "No response from Grok API."
+                job.status = "failed"
+            else:
+                job.status = "succeeded"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        job.finished_at = time.time()
+        if job.webhook:
+            asyncio.get_running_loop().run_in_executor(None, self._notify, job)
+
+    def _notify(self, job: Job):
+        try:
+            request = urllib.request.Request(job.webhook,
+                                             data=json.dumps(job.to_dict(), ensure_ascii=False).encode("utf-8"),
+                                             headers={"Content-Type": "application/json"},
+                                             method="POST")
+            with urllib.request.urlopen(request, timeout=self.webhook_timeout) as response:
+                response.read()
+        except Exception as e:
+            logger.error(f"Webhook for job {job.id} failed: {e}")
@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional
+
+from grok3api.logger import logger
+
+OK = "ok"
+RATE_LIMITED = "rate_limited"
+AUTH_ERROR = "auth_error"
+ERROR = "error"
+CANCELLED = "cancelled"  # says nothing about the account or proxy, so it changes no limits or counters
+
+
+@dataclass
+class _Limit:
+    concurrency: float
+    rpm: float
+    in_flight: int = 0
+    starts: Deque[float] = field(default_factory=deque)
+    latency: Optional[float] = None
+    successes: int = 0
+    rate_limited: int = 0
+    auth_errors: int = 0
+    errors: int = 0
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limiter of concurrent requests and requests per minute, kept separately for every account/proxy pair.
+
+    Every success raises the limits additively (by about one request of concurrency per round of requests,
+    and about `rpm_increase` requests per minute per minute of traffic); a 429 or a credential error halves them.
+    If `latency_target` is set, a slower response lowers the concurrency a little as well,
+    so the limits settle just under the point where Grok starts pushing back.
+
+    :param initial_concurrency: Concurrency of a pair that has not been seen yet.
+    :param min_concurrency: Lower bound of the concurrency.
+    :param max_concurrency: Upper bound of the concurrency.
+    :param initial_rpm: Requests per minute of a pair that has not been seen yet.
+    :param min_rpm: Lower bound of the requests per minute.
+    :param max_rpm: Upper bound of the requests per minute.
+    :param rpm_increase: Additive increase of the requests per minute.
+    :param decrease: Multiplicative decrease on a rate limit or credential error.
+    :param latency_target: Response time in seconds above which the concurrency is lowered by 10%.
+    """
+
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(self,
+                 initial_concurrency: float = 2,
+                 min_concurrency: float = 1,
+                 max_concurrency: float = 8,
+                 initial_rpm: float = 20,
+                 min_rpm: float = 2,
+                 max_rpm: float = 120,
+                 rpm_increase: float = 2,
+                 decrease: float = 0.5,
+                 latency_target: Optional[float] = None):
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.initial_rpm = initial_rpm
+        self.min_rpm = min_rpm
+        self.max_rpm = max_rpm
+        self.rpm_increase = rpm_increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self._state = threading.Condition()
+        self._limits: Dict[str, _Limit] = {}
+
+    def _limit(self, key: str) -> _Limit:
+        limit = self._limits.get(key)
+        if limit is None:
+            limit = self._limits[key] = _Limit(concurrency=self.initial_concurrency, rpm=self.initial_rpm)
+        return limit
+
+    def _delay(self, limit: _Limit, now: float) -> float:
+        """Seconds until the pair may start another request (0 if it may start now). Must be called with the lock held."""
+        while limit.starts and limit.starts[0] <= now - 60:
+            limit.starts.popleft()
+        if limit.in_flight >= int(limit.concurrency):
+            return -1
+        if len(limit.starts) >= int(limit.rpm):
+            return limit.starts[0] + 60 - now
+        return 0
+
+    def acquire(self, key: str, timeout: Optional[float] = None) -> bool:
+        """Waits until the pair is within its limits and takes a slot. Returns False if `timeout` ran out first."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._state:
+            limit = self._limit(key)
+            while True:
+                now = time.monotonic()
+                delay = self._delay(limit, now)
+                if delay == 0:
+                    break
+                remaining = deadline - now if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                wait = delay if delay > 0 else None  # -1: wait for a release
+                if remaining is not None:
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._state.wait(wait)
+            limit.in_flight += 1
+            limit.starts.append(now)
+            return True
+
+    def release(self, key: str, outcome: str = OK, latency: Optional[float] = None):
+        """Returns the slot and adjusts the limits of the pair by the outcome of the request."""
+        with self._state:
+            limit = self._limit(key)
+            limit.in_flight = max(limit.in_flight - 1, 0)
+            if latency is not None and outcome != CANCELLED:
+                limit.latency = latency if limit.latency is None else \
+                    limit.latency + self.LATENCY_SMOOTHING * (latency - limit.latency)
+
+            if outcome in (RATE_LIMITED, AUTH_ERROR):
+                if outcome == RATE_LIMITED:
+                    limit.rate_limited += 1
+                else:
+                    limit.auth_errors += 1
+                limit.concurrency = max(self.min_concurrency, limit.concurrency * self.decrease)
+                limit.rpm = max(self.min_rpm, limit.rpm * self.decrease)
+                logger.debug(f"Limiter {key}: {outcome}, lowered to {limit.concurrency:.1f} concurrent, {limit.rpm:.0f} rpm")
+            elif outcome == OK:
+                limit.successes += 1
+                if self.latency_target is not None and latency is not None and latency > self.latency_target:
+                    limit.concurrency = max(self.min_concurrency, limit.concurrency * 0.9)
+                else:
+                    limit.concurrency = min(self.max_concurrency, limit.concurrency + 1 / limit.concurrency)
+                limit.rpm = min(self.max_rpm, limit.rpm + self.rpm_increase / limit.rpm)
+            elif outcome != CANCELLED:
+                limit.errors += 1
+            self._state.notify_all()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Current limits, usage and counters of every account/proxy pair."""
+        with self._state:
+            now = time.monotonic()
+            result = {}
+            for key, limit in self._limits.items():
+                self._delay(limit, now)
+                result[key] = {
+                    "concurrency": round(limit.concurrency, 2),
+                    "rpm": round(limit.rpm, 1),
+                    "in_flight": limit.in_flight,
+                    "requests_last_minute": len(limit.starts),
+                    "latency": round(limit.latency, 3) if limit.latency is not None else None,
+                    "successes": limit.successes,
+                    "rate_limited": limit.rate_limited,
+                    "auth_errors": limit.auth_errors,
+                    "errors": limit.errors,
+                }
+            return result
@@ -1,4 +1,6 @@
 import logging
+import random
+from typing import Any, Dict, Optional
 
 log_level = logging.WARNING
 logger = logging.getLogger(__name__)
@@ -10,4 +12,51 @@ console_handler.setLevel(log_level)
 formatter = logging.Formatter("[%(asctime)s] [%(levelname)s] [%(name)s]: %(message)s")
 console_handler.setFormatter(formatter)
 
-logger.addHandler(console_handler)
\ No newline at end of file
+logger.addHandler(console_handler)
+
+debug_sample_rate = 1.0
+max_field_length = 2000
+
+
+def configure_debug(sample_rate: Optional[float] = None, max_length: Optional[int] = None):
+    """
+    Tunes debug_event: `sample_rate` (0-1) is the share of sampled events (payload and response dumps) that are logged,
+    `max_length` the number of characters kept of every field.
+    """
+    global debug_sample_rate, max_field_length
+    if sample_rate is not None:
+        debug_sample_rate = sample_rate
+    if max_length is not None:
+        max_field_length = max_length
+
+
+class _Fields:
+    """Formats the fields of an event only when a handler actually emits the record."""
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: Dict[str, Any]):
+        self.fields = fields
+
+    def __str__(self):
+        parts = []
+        for key, value in self.fields.items():
+            text = str(value)
+            if len(text) > max_field_length:
+                text = f"{text[:max_field_length]}... ({len(text)} chars)"
+            parts.append(f"{key}={text}")
+        return " ".join(parts)
+
+
+def debug_event(event: str, sampled: bool = False, **fields: Any):
+    """
+    Logs `event key=value ...` at DEBUG level. Nothing is formatted while DEBUG is disabled, long fields are truncated,
+    and `sampled` events (large dumps on hot paths) are logged for only `debug_sample_rate` of the calls.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if sampled and debug_sample_rate < 1.0 and random.random() >= debug_sample_rate:
+        return
+    if fields:
+        logger.debug("%s %s", event, _Fields(fields))
+    else:
+        logger.debug(event)
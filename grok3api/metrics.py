@@ -0,0 +1,216 @@
+import bisect
+import contextvars
+import socket
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from grok3api.logger import logger
+
+try:
+    from opentelemetry import metrics as otel_metrics
+    OPENTELEMETRY_AVAILABLE = True
+except ImportError:
+    OPENTELEMETRY_AVAILABLE = False
+
+# Phases recorded by GrokClient.ask()
+DRIVER_INIT = "driver_init"
+SET_COOKIES = "set_cookies"
+UPLOAD_IMAGE = "upload_image"
+LIMITER_WAIT = "limiter_wait"
+EXECUTE_SCRIPT = "execute_script"
+FIRST_BYTE = "first_byte"
+BODY = "body"
+PARSE = "parse"
+RECOVERY = "recovery"
+HISTORY_SAVE = "history_save"
+TOTAL = "total"
+
+
+class Span(NamedTuple):
+    """One timed phase of an ask(). `start` is relative to the start of the ask(), both in seconds."""
+    name: str
+    start: float
+    duration: float
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _Timer:
+    __slots__ = ("_spans", "_name", "_started")
+
+    def __init__(self, spans: "Spans", name: str):
+        self._spans = spans
+        self._name = name
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._spans.add(self._name, self._started, time.perf_counter())
+        return False
+
+
+class NullSpans:
+    """Recorder used without a metrics sink: every call is a no-op and nothing is allocated."""
+    __slots__ = ()
+    enabled = False
+    items: List[Span] = []
+    _TIMER = _NullTimer()
+
+    def span(self, name: str) -> _NullTimer:
+        return self._TIMER
+
+    def add(self, name: str, started: float, ended: float):
+        pass
+
+    def totals(self) -> Dict[str, float]:
+        return {}
+
+
+NULL_SPANS = NullSpans()
+
+
+class Spans:
+    """Timing spans of one ask(). Use `with spans.span(name):` or add() with time.perf_counter() values."""
+    __slots__ = ("origin", "items")
+    enabled = True
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.items: List[Span] = []
+
+    def span(self, name: str) -> _Timer:
+        return _Timer(self, name)
+
+    def add(self, name: str, started: float, ended: float):
+        self.items.append(Span(name, started - self.origin, ended - started))
+
+    def totals(self) -> Dict[str, float]:
+        """Time per phase, summed over the attempts of the ask()."""
+        totals: Dict[str, float] = {}
+        for item in self.items:
+            totals[item.name] = totals.get(item.name, 0.0) + item.duration
+        return totals
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("grok3api_spans", default=NULL_SPANS)
+
+
+def current_spans():
+    """Recorder of the ask() running in this thread or task, or NULL_SPANS."""
+    return _current.get()
+
+
+def activate(spans) -> contextvars.Token:
+    return _current.set(spans)
+
+
+def deactivate(token: contextvars.Token):
+    _current.reset(token)
+
+
+class MetricsSink:
+    """Receives the per-phase times of every ask() made by a GrokClient with this sink. The base class drops them."""
+
+    def record(self, totals: Dict[str, float], tags: Dict[str, str]):
+        pass
+
+
+class HistogramSink(MetricsSink):
+    """
+    In-memory histograms of every phase, for processes that expose their own stats.
+
+    :param buckets: Upper bounds of the buckets in seconds.
+    """
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, totals: Dict[str, float], tags: Dict[str, str]):
+        with self._lock:
+            for name, seconds in totals.items():
+                histogram = self._histograms.get(name)
+                if histogram is None:
+                    histogram = self._histograms[name] = {"count": 0, "sum": 0.0, "max": 0.0,
+                                                          "buckets": [0] * (len(self.buckets) + 1)}
+                histogram["count"] += 1
+                histogram["sum"] += seconds
+                histogram["max"] = max(histogram["max"], seconds)
+                histogram["buckets"][bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def quantile(self, name: str, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (0-1) of a phase, or None if it has no samples."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                return None
+            rank = q * histogram["count"]
+            seen = 0
+            for index, count in enumerate(histogram["buckets"]):
+                seen += count
+                if seen >= rank and count:
+                    return self.buckets[index] if index < len(self.buckets) else histogram["max"]
+            return histogram["max"]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            names = list(self._histograms)
+        result = {}
+        for name in names:
+            with self._lock:
+                histogram = self._histograms[name]
+                count, total, maximum = histogram["count"], histogram["sum"], histogram["max"]
+            result[name] = {"count": count, "mean": total / count if count else 0.0, "max": maximum,
+                            "p50": self.quantile(name, 0.5), "p99": self.quantile(name, 0.99)}
+        return result
+
+
+class StatsdSink(MetricsSink):
+    """
+    Sends every phase as a statsd timer (`<prefix>.<phase>:<ms>|ms`), one UDP packet per ask().
+    Tags are appended in the DogStatsD format when `tags` is True.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8125, prefix: str = "grok3api", tags: bool = False):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.tags = tags
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def record(self, totals: Dict[str, float], tags: Dict[str, str]):
+        suffix = "|#" + ",".join(f"{key}:{value}" for key, value in tags.items()) if self.tags and tags else ""
+        lines = [f"{self.prefix}.{name}:{seconds * 1000:.3f}|ms{suffix}" for name, seconds in totals.items()]
+        try:
+            self._socket.sendto("\n".join(lines).encode("utf-8"), self.address)
+        except OSError as e:
+            logger.debug(f"In StatsdSink.record: {e}")
+
+
+class OpenTelemetrySink(MetricsSink):
+    """Records every phase on an OpenTelemetry histogram `grok3api.phase.duration` with a `phase` attribute."""
+
+    def __init__(self, meter=None):
+        if not OPENTELEMETRY_AVAILABLE:
+            raise ImportError("OpenTelemetrySink requires the opentelemetry-api package")
+        meter = meter or otel_metrics.get_meter("grok3api")
+        self._histogram = meter.create_histogram("grok3api.phase.duration", unit="s",
+                                                 description="Time spent in each phase of GrokClient.ask()")
+
+    def record(self, totals: Dict[str, float], tags: Dict[str, str]):
+        for name, seconds in totals.items():
+            self._histogram.record(seconds, attributes=dict(tags, phase=name))
@@ -0,0 +1,159 @@
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from grok3api.logger import logger
+
+DEFAULT_PORTS = {"http": 80, "https": 443, "socks4": 1080, "socks5": 1080}
+
+
+@dataclass
+class ProxyState:
+    url: str
+    latency: Optional[float] = None
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+    ejections: int = 0
+    last_probe: float = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.latency is not None and not self.ejected_until
+
+
+class ProxyPool:
+    """
+    Proxies with periodic TCP connect probes. The browser gets a proxy from the pool when it is created,
+    chosen at random with a weight of 1 / latency among the healthy ones, so the fastest proxy gets most browsers.
+
+    A proxy is ejected after `eject_after` consecutive failures (failed probes or region blocks seen by requests)
+    for `eject_time` seconds, doubled on every further ejection, and re-admitted by the first successful probe after that.
+
+    :param proxies: Proxy URLs, e.g. "socks5://host:1080" or "http://host:8080".
+    :param probe_interval: Seconds between probe rounds of the background thread.
+    :param probe_timeout: Connect timeout of a probe in seconds.
+    :param eject_after: Consecutive failures that eject a proxy.
+    :param eject_time: Initial ejection time in seconds.
+    """
+
+    LATENCY_SMOOTHING = 0.3
+    MAX_EJECT_TIME = 3600
+
+    def __init__(self,
+                 proxies: List[str],
+                 probe_interval: float = 60,
+                 probe_timeout: float = 5,
+                 eject_after: int = 2,
+                 eject_time: float = 300):
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.eject_after = eject_after
+        self.eject_time = eject_time
+        self._lock = threading.Lock()
+        self._proxies: Dict[str, ProxyState] = {url: ProxyState(url) for url in proxies}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def probe(self, url: str) -> Optional[float]:
+        """TCP connect time to the proxy in seconds, or None if it is unreachable."""
+        parts = urlsplit(url if "://" in url else f"http://{url}")
+        port = parts.port or DEFAULT_PORTS.get(parts.scheme, 1080)
+        started = time.monotonic()
+        try:
+            with socket.create_connection((parts.hostname, port), timeout=self.probe_timeout):
+                return time.monotonic() - started
+        except (OSError, ValueError):
+            return None
+
+    def probe_all(self):
+        """Probes every proxy concurrently and updates latencies and ejections."""
+        urls = list(self._proxies)
+        if not urls:
+            return
+        with ThreadPoolExecutor(max_workers=min(len(urls), 16), thread_name_prefix="grok3api-proxy-probe") as executor:
+            for url, latency in zip(urls, executor.map(self.probe, urls)):
+                self._record(url, latency)
+
+    def _record(self, url: str, latency: Optional[float]):
+        with self._lock:
+            state = self._proxies.get(url)
+            if state is None:
+                return
+            state.last_probe = time.monotonic()
+            if latency is None:
+                self._fail(state)
+                return
+            state.consecutive_failures = 0
+            state.latency = latency if state.latency is None else \
+                state.latency + self.LATENCY_SMOOTHING * (latency - state.latency)
+            if state.ejected_until and state.ejected_until <= time.monotonic():
+                state.ejected_until = 0.0
+                logger.debug(f"Proxy {url} re-admitted ({latency * 1000:.0f} ms)")
+
+    def _fail(self, state: ProxyState):
+        """Must be called with the lock held."""
+        state.consecutive_failures += 1
+        if state.consecutive_failures >= self.eject_after and state.ejected_until <= time.monotonic():
+            state.ejections += 1
+            eject_time = min(self.eject_time * 2 ** (state.ejections - 1), self.MAX_EJECT_TIME)
+            state.ejected_until = time.monotonic() + eject_time
+            logger.debug(f"Proxy {state.url} ejected for {int(eject_time)} sec")
+
+    def report_failure(self, url: Optional[str]):
+        """Counts a failure seen by a request (e.g. a region block) against the proxy."""
+        with self._lock:
+            state = self._proxies.get(url) if url else None
+            if state is not None:
+                self._fail(state)
+
+    def is_healthy(self, url: Optional[str]) -> bool:
+        """False only for a proxy of the pool that is ejected or has never answered a probe."""
+        with self._lock:
+            state = self._proxies.get(url) if url else None
+            return state is None or state.healthy
+
+    def choose(self, exclude: Optional[str] = None) -> Optional[str]:
+        """A healthy proxy, weighted towards the fastest, or None if there is none."""
+        with self._lock:
+            candidates = [state for state in self._proxies.values() if state.healthy and state.url != exclude]
+            if not candidates:
+                return None
+            weights = [1.0 / max(state.latency, 0.001) for state in candidates]
+            return random.choices(candidates, weights=weights)[0].url
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            now = time.monotonic()
+            return {state.url: {
+                "healthy": state.healthy,
+                "latency_ms": round(state.latency * 1000, 1) if state.latency is not None else None,
+                "consecutive_failures": state.consecutive_failures,
+                "ejected_for": max(0.0, round(state.ejected_until - now, 1)),
+            } for state in self._proxies.values()}
+
+    def start(self):
+        """Probes all proxies once, then keeps probing them in a background thread."""
+        self.probe_all()
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="grok3api-proxy-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.probe_timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.probe_interval):
+            try:
+                self.probe_all()
+            except Exception as e:
+                logger.error(f"In ProxyPool: {e}")
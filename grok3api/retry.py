@@ -0,0 +1,82 @@
+import random
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+RATE_LIMIT = "rate_limit"
+AUTH = "auth"
+REGION = "region"
+CHALLENGE = "challenge"
+TIMEOUT = "timeout"
+TRANSPORT = "transport"
+REQUEST = "request"  # rejected by Grok with a 4xx a retry does not fix; returned as is
+CANCELLED = "cancelled"  # cancelled through its RequestHandle; never retried
+
+
+def classify(response: Any) -> Optional[str]:
+    """
+    Error class of a _send_request result, or None for a successful response.
+    Failures without an HTTP response (status 0: network errors, a reloaded page) and 5xx answers are TRANSPORT.
+    """
+    if isinstance(response, dict) and response.get("result"):
+        return None
+    if isinstance(response, dict) and response.get("error_code") == "Cancelled":
+        return CANCELLED
+    text = str(response)
+    if 'Too many requests' in text or 'HTTP 429' in text:
+        return RATE_LIMIT
+    if 'credentials' in text or 'HTTP 401' in text:
+        return AUTH
+    if 'This service is not available in your region' in text:
+        return REGION
+    if 'Just a moment' in text or '403' in text:
+        return CHALLENGE
+    if 'TimeoutError' in text:
+        return TIMEOUT
+    if isinstance(response, dict) and response.get("error"):
+        status = response.get("status")
+        if response.get("error_code") == "Transport" or status == 0 or (isinstance(status, int) and status >= 500):
+            return TRANSPORT
+        return REQUEST
+    return TRANSPORT
+
+
+@dataclass
+class Attempt:
+    """Outcome and timing of one attempt of an ask()."""
+    number: int
+    error_class: Optional[str]
+    duration: float
+    account: Optional[str] = None
+    recovery: Optional[str] = None
+    delay: float = 0.0
+
+
+@dataclass
+class RetryPolicy:
+    """
+    How ask() retries. The worst case of one ask() is `deadline` seconds (plus the recovery of the last failure),
+    and every attempt gets at most the time left.
+
+    :param max_attempts: Maximum number of requests to Grok.
+    :param deadline: Time budget of the whole ask() in seconds. Defaults to twice the request timeout.
+    :param base_delay: Backoff before the second attempt, doubled for every further one.
+    :param max_delay: Upper bound of the backoff.
+    :param jitter: Share of the backoff that is randomized, so concurrent clients do not retry in lockstep.
+    :param backoff_classes: Error classes that wait before the next attempt. The others retry right after their recovery.
+    """
+    max_attempts: int = 5
+    deadline: Optional[float] = None
+    base_delay: float = 1.0
+    max_delay: float = 20.0
+    jitter: float = 0.5
+    backoff_classes: Tuple[str, ...] = (RATE_LIMIT, AUTH, TRANSPORT)
+
+    def budget(self, timeout: float) -> float:
+        return self.deadline if self.deadline is not None else timeout * 2
+
+    def backoff(self, attempt: int, error_class: str) -> float:
+        """Delay after the given (1-based) failed attempt."""
+        if error_class not in self.backoff_classes:
+            return 0.0
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * (1 - self.jitter * random.random())
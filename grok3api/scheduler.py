@@ -0,0 +1,169 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+
+class SchedulerFull(Exception):
+    """Raised when a request is rejected because its priority class already has max_queue requests waiting."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("future", "tenant", "priority", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, tenant: str, priority: str):
+        self.future = future
+        self.tenant = tenant
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionScheduler:
+    """
+    Admission control in front of GrokClient.
+
+    Interactive requests always go before batch ones, and batch requests never take the last
+    `interactive_reserve` slots, so a saturating batch load cannot push interactive latency up.
+    Inside a class, tenants (API keys) share the slots by weighted fair queuing:
+    a tenant flooding the queue only delays itself.
+
+    :param max_concurrency: Number of requests running at the same time.
+    :param max_queue: Maximum number of waiting requests per priority class. Further requests are rejected at once.
+    :param interactive_reserve: Slots batch requests may not use.
+    :param weights: Tenant weights (default 1.0). A tenant with weight 2 gets twice the share of a tenant with weight 1.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = 4,
+                 max_queue: int = 100,
+                 interactive_reserve: int = 1,
+                 weights: Optional[Dict[str, float]] = None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.interactive_reserve = min(interactive_reserve, max_concurrency - 1)
+        self.weights: Dict[str, float] = dict(weights or {})
+        self._running: Dict[str, int] = {priority: 0 for priority in PRIORITIES}
+        self._queues: Dict[str, List[Tuple[float, int, _Waiter]]] = {priority: [] for priority in PRIORITIES}
+        self._waiting: Dict[str, int] = {priority: 0 for priority in PRIORITIES}
+        self._virtual_time: Dict[str, float] = {priority: 0.0 for priority in PRIORITIES}
+        self._finish_tags: Dict[str, Dict[str, float]] = {priority: {} for priority in PRIORITIES}
+        self._sequence = itertools.count()
+        self._waits: Dict[str, Deque[float]] = {priority: deque(maxlen=1000) for priority in PRIORITIES}
+        self._admitted: Dict[str, int] = defaultdict(int)
+        self._rejected: Dict[str, int] = defaultdict(int)
+        self._wait_total: Dict[str, float] = defaultdict(float)
+
+    @property
+    def running(self) -> int:
+        return sum(self._running.values())
+
+    def _has_capacity(self, priority: str) -> bool:
+        limit = self.max_concurrency if priority == INTERACTIVE else self.max_concurrency - self.interactive_reserve
+        return self.running < limit
+
+    def _enqueue(self, waiter: _Waiter):
+        """Weighted fair queuing: the tag is the virtual time at which the tenant's share would have served it."""
+        priority = waiter.priority
+        weight = self.weights.get(waiter.tenant, 1.0)
+        start = max(self._virtual_time[priority], self._finish_tags[priority].get(waiter.tenant, 0.0))
+        tag = start + 1.0 / weight
+        self._finish_tags[priority][waiter.tenant] = tag
+        heapq.heappush(self._queues[priority], (tag, next(self._sequence), waiter))
+        self._waiting[priority] += 1
+
+    def _dispatch(self):
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue and self._has_capacity(priority):
+                tag, _, waiter = heapq.heappop(queue)
+                if waiter.future.done():  # cancelled while waiting
+                    continue
+                self._waiting[priority] -= 1
+                self._virtual_time[priority] = tag
+                self._start(waiter.priority, time.monotonic() - waiter.enqueued_at)
+                waiter.future.set_result(None)
+            if queue:
+                return  # lower classes wait until this one is drained
+
+    def _start(self, priority: str, waited: float):
+        self._running[priority] += 1
+        self._admitted[priority] += 1
+        self._waits[priority].append(waited)
+        self._wait_total[priority] += waited
+
+    def _release(self, priority: str):
+        self._running[priority] -= 1
+        if not any(self._queues.values()):
+            # Idle: forget the history so a returning tenant is not penalized for old traffic.
+            for priority_class in PRIORITIES:
+                self._finish_tags[priority_class].clear()
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, tenant: str = "", priority: str = INTERACTIVE, enforce_limit: bool = True) -> AsyncIterator[None]:
+        """
+        Waits for a slot and holds it for the duration of the block.
+        Raises SchedulerFull right away if the queue of this class is full (unless enforce_limit is False).
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}")
+        if self._has_capacity(priority) and not any(self._waiting[p] for p in PRIORITIES[:PRIORITIES.index(priority) + 1]):
+            self._start(priority, 0.0)
+        else:
+            if enforce_limit and self._waiting[priority] >= self.max_queue:
+                self._rejected[priority] += 1
+                raise SchedulerFull(f"Too many {priority} requests waiting ({self._waiting[priority]})",
+                                    retry_after=max(1.0, self.average_wait(priority)))
+            waiter = _Waiter(asyncio.get_running_loop().create_future(), tenant, priority)
+            self._enqueue(waiter)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    self._release(priority)  # the slot was granted just before the cancellation
+                else:
+                    self._waiting[priority] -= 1
+                raise
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def average_wait(self, priority: str) -> float:
+        waits = self._waits[priority]
+        return sum(waits) / len(waits) if waits else 0.0
+
+    @staticmethod
+    def _percentile(values: List[float], percent: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(int(percent / 100 * len(ordered)), len(ordered) - 1)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, running requests, admissions, rejections and queue wait (over the last 1000 requests) per class."""
+        result: Dict[str, Any] = {"max_concurrency": self.max_concurrency, "running": self.running}
+        for priority in PRIORITIES:
+            waits = list(self._waits[priority])
+            result[priority] = {
+                "queued": self._waiting[priority],
+                "running": self._running[priority],
+                "admitted": self._admitted[priority],
+                "rejected": self._rejected[priority],
+                "wait_seconds_total": self._wait_total[priority],
+                "wait_p50": self._percentile(waits, 50),
+                "wait_p99": self._percentile(waits, 99),
+                "wait_max": max(waits) if waits else 0.0,
+            }
+        return result
@@ -1,16 +1,29 @@
 # this code is not very well debugged yet, but it seems to work
 import argparse
+import asyncio
+import hashlib
+import math
 import os
+import time
 import json
 from typing import List, Dict, Optional, Any
 
 from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
 import uvicorn
-from starlette.responses import PlainTextResponse
+from starlette.responses import PlainTextResponse, Response
 
+from grok3api import cache as content_cache
+from grok3api import driver
+from grok3api.cache import ResponseCache
 from grok3api.client import GrokClient
+from grok3api.hedging import HedgePolicy
+from grok3api.jobs import JobQueue, JobQueueFull
+from grok3api.limiter import AdaptiveLimiter
 from grok3api.logger import logger
+from grok3api.metrics import StatsdSink
+from grok3api.prometheus import Registry, CONTENT_TYPE
+from grok3api.scheduler import AdmissionScheduler, SchedulerFull, INTERACTIVE, PRIORITIES
 from grok3api.types.GrokResponse import GrokResponse
 
 
@@ -30,6 +43,13 @@ class Choice(BaseModel):
     message: Message
     finish_reason: str
 
+class JobRequest(BaseModel):
+    model: str = "grok-3"
+    messages: List[Message]
+    deepsearch_preset: str = ""
+    isReasoning: bool = False
+    webhook: Optional[str] = None
+
 class ChatCompletionResponse(BaseModel):
     id: str
     object: str = "chat.completion"
@@ -41,7 +61,96 @@ class ChatCompletionResponse(BaseModel):
 app = FastAPI(title="Grok3API OpenAI-Compatible Server")
 
 env_cookies = os.getenv("GROK_COOKIES", None)
-TIMEOUT = os.getenv("GROK_TIMEOUT", 120)
+TIMEOUT = int(os.getenv("GROK_TIMEOUT", 120))
+RESPONSE_CACHE_TTL = os.getenv("GROK_RESPONSE_CACHE_TTL", None)
+COALESCE_REQUESTS = os.getenv("GROK_COALESCE_REQUESTS", "1") != "0"
+JOB_WORKERS = int(os.getenv("GROK_JOB_WORKERS", 2))
+JOB_QUEUE_SIZE = int(os.getenv("GROK_JOB_QUEUE_SIZE", 100))
+JOB_RESULT_TTL = float(os.getenv("GROK_JOB_RESULT_TTL", 3600))
+JOB_TIMEOUT = int(os.getenv("GROK_JOB_TIMEOUT", 900))
+MAX_CONCURRENCY = int(os.getenv("GROK_MAX_CONCURRENCY", 4))
+MAX_QUEUE = int(os.getenv("GROK_MAX_QUEUE", 100))
+INTERACTIVE_RESERVE = int(os.getenv("GROK_INTERACTIVE_RESERVE", 1))
+TENANT_WEIGHTS = os.getenv("GROK_TENANT_WEIGHTS", "")  # "api_key1=3,api_key2=1"
+ADAPTIVE_LIMITS = os.getenv("GROK_ADAPTIVE_LIMITS", "0") == "1"
+HEDGE_PERCENTILE = os.getenv("GROK_HEDGE_PERCENTILE", None)  # e.g. 95; unset disables hedging
+STATSD_ADDRESS = os.getenv("GROK_STATSD_ADDRESS", None)  # "host:port" to send per-phase timings to statsd
+METRIC_MODELS = frozenset(filter(None, (model.strip() for model in
+                                         os.getenv("GROK_METRIC_MODELS", "grok-3,grok-2").split(","))))
+DISCONNECT_POLL_INTERVAL = 0.5
+
+
+def tenant_id(api_key: str) -> str:
+    """Tenants are identified by a hash of their API key, so keys never show up in stats."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def parse_tenant_weights(value: str) -> Dict[str, float]:
+    weights = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        key, _, weight = entry.rpartition("=")
+        weights[tenant_id(key)] = float(weight)
+    return weights
+
+
+def model_label(model: str) -> str:
+    """The model as a metric label. It comes from the request body, so models outside GROK_METRIC_MODELS share "other"."""
+    return model if not model or model in METRIC_MODELS else "other"
+
+
+def statsd_sink(address: str) -> StatsdSink:
+    host, _, port = address.rpartition(":")
+    return StatsdSink(host=host or "127.0.0.1", port=int(port))
+
+
+registry = Registry()
+http_requests = registry.counter("grok3api_http_requests_total", "HTTP requests by endpoint, model and status.",
+                                 ("endpoint", "model", "status"))
+http_duration = registry.histogram("grok3api_http_request_duration_seconds", "HTTP request latency.",
+                                   ("endpoint", "model"))
+http_received = registry.counter("grok3api_http_request_bytes_total", "Bytes received in request bodies.", ("endpoint",))
+http_sent = registry.counter("grok3api_http_response_bytes_total", "Bytes sent in response bodies.", ("endpoint",))
+upstream_attempts = registry.counter("grok3api_upstream_attempts_total",
+                                     "Requests sent to Grok by outcome (ok, rate_limit, challenge, ...).", ("outcome",))
+recoveries = registry.counter("grok3api_recoveries_total",
+                              "Recovery actions after failed attempts (restart_session, restart_browser, ...).", ("action",))
+registry.gauge_callback("grok3api_queue_depth", "Requests waiting for the scheduler, and queued jobs.",
+                        lambda: [({"queue": priority}, scheduler.stats()[priority]["queued"]) for priority in PRIORITIES]
+                        + [({"queue": "jobs"}, job_queue.depth)])
+registry.gauge_callback("grok3api_in_flight_requests", "Requests admitted by the scheduler and running.",
+                        lambda: [({}, scheduler.running)])
+registry.gauge_callback("grok3api_browser_in_flight", "Requests currently using the browser.",
+                        lambda: [({}, driver.web_driver.in_flight)])
+registry.gauge_callback("grok3api_browser_utilization", "Requests using the browser per allowed concurrent request.",
+                        lambda: [({}, driver.web_driver.in_flight / max(MAX_CONCURRENCY, 1))])
+registry.counter_callback("grok3api_browser_starts_total", "Browser starts, including restarts and recycles.",
+                          lambda: [({}, driver.web_driver.generation)])
+registry.counter_callback("grok3api_cache_hits_total", "Cache hits.", lambda: cache_counts("hits"))
+registry.counter_callback("grok3api_cache_misses_total", "Cache misses.", lambda: cache_counts("misses"))
+registry.gauge_callback("grok3api_cache_hit_ratio", "Share of cache lookups that were hits.", lambda: [
+    ({"cache": name}, cache.hits / (cache.hits + cache.misses) if cache.hits + cache.misses else 0.0)
+    for name, cache in caches()])
+
+
+def caches():
+    result = []
+    if grok_client.response_cache is not None:
+        result.append(("response", grok_client.response_cache))
+    if content_cache.image_cache is not None:
+        result.append(("image", content_cache.image_cache))
+    return result
+
+
+def cache_counts(counter: str):
+    return [({"cache": name}, getattr(cache, counter)) for name, cache in caches()]
+
+
+def count_attempts(response: GrokResponse):
+    for attempt in response.attempts:
+        upstream_attempts.inc(outcome=attempt.error_class or "ok")
+        if attempt.recovery:
+            recoveries.inc(action=attempt.recovery)
+
 
 try:
     grok_client = GrokClient(
@@ -50,16 +159,111 @@ try:
         timeout=TIMEOUT,
         history_msg_count=0,
         always_new_conversation=True,
+        response_cache=ResponseCache(ttl=float(RESPONSE_CACHE_TTL)) if RESPONSE_CACHE_TTL else None,
+        coalesce_requests=COALESCE_REQUESTS,
+        limiter=AdaptiveLimiter(max_concurrency=MAX_CONCURRENCY) if ADAPTIVE_LIMITS else None,
+        hedge_policy=HedgePolicy(percentile=float(HEDGE_PERCENTILE)) if HEDGE_PERCENTILE else None,
+        metrics_sink=statsd_sink(STATSD_ADDRESS) if STATSD_ADDRESS else None,
+        on_response=count_attempts,
     )
 except Exception as e:
     logger.error(f"Failed to initialize GrokClient: {e}")
     raise
 
-async def handle_grok_str_request(q: str):
+scheduler = AdmissionScheduler(max_concurrency=MAX_CONCURRENCY,
+                               max_queue=MAX_QUEUE,
+                               interactive_reserve=INTERACTIVE_RESERVE,
+                               weights=parse_tenant_weights(TENANT_WEIGHTS))
+
+job_queue = JobQueue(grok_client, workers=JOB_WORKERS, max_queue=JOB_QUEUE_SIZE, result_ttl=JOB_RESULT_TTL,
+                     scheduler=scheduler)
+
+
+def request_tenant(request: Request) -> str:
+    """Tenant of a request: its API key (Authorization header), or the client address without one."""
+    authorization = request.headers.get("authorization", "")
+    api_key = authorization[7:] if authorization.lower().startswith("bearer ") else authorization
+    if api_key:
+        return tenant_id(api_key)
+    return request.client.host if request.client else ""
+
+
+def request_priority(request: Request, default: str = INTERACTIVE) -> str:
+    """Priority class from the X-Priority header (interactive / batch)."""
+    priority = request.headers.get("x-priority", default).lower()
+    return priority if priority in PRIORITIES else default
+
+
+async def until_disconnected(request: Request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+
+async def scheduled_ask(request: Request, **kwargs) -> GrokResponse:
+    """
+    Runs async_ask once the scheduler admits the request; a full queue is answered with 429.
+    If the client disconnects first, the request is cancelled in the browser and its slot is freed.
+    """
+    try:
+        async with scheduler.slot(request_tenant(request), request_priority(request)):
+            ask = asyncio.ensure_future(grok_client.async_ask(**kwargs))
+            disconnected = asyncio.ensure_future(until_disconnected(request))
+            try:
+                await asyncio.wait({ask, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                disconnected.cancel()
+                if not ask.done():
+                    ask.cancel()
+            if ask.cancelled():
+                logger.debug("Client disconnected, request cancelled")
+                raise HTTPException(status_code=499, detail="Client closed the request.")
+            return ask.result()
+    except SchedulerFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    started = time.monotonic()
+    response = None
+    try:
+        response = await call_next(request)
+        return response
+    finally:
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        if endpoint != "/metrics":
+            model = model_label(getattr(request.state, "model", ""))
+            status = str(response.status_code) if response is not None else "500"
+            http_requests.inc(endpoint=endpoint, model=model, status=status)
+            http_duration.observe(time.monotonic() - started, endpoint=endpoint, model=model)
+            http_received.inc(int(request.headers.get("content-length") or 0), endpoint=endpoint)
+            if response is not None:
+                http_sent.inc(int(response.headers.get("content-length") or 0), endpoint=endpoint)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Operational metrics in the Prometheus text format."""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
+
+async def handle_grok_str_request(request: Request, q: str):
     if not q.strip():
         raise HTTPException(status_code=400, detail="Query string cannot be empty.")
+    request.state.model = "grok-3"
 
-    response: GrokResponse = await grok_client.async_ask(
+    response: GrokResponse = await scheduled_ask(
+        request,
         message=q,
         modelName="grok-3",
         timeout=TIMEOUT,
@@ -70,22 +274,23 @@ async def handle_grok_str_request(q: str):
         enableSideBySide=False
     )
 
-    if response.error or not response.modelResponse.message:
+    summary = response.summary()
+    if summary.error or not summary.message:
         raise HTTPException(
             status_code=500,
-            detail=response.error or "No response from Grok API."
+            detail=summary.error or "No response from Grok API."
         )
 
-    return response.modelResponse.message
+    return summary.message
 
 
 @app.get("/v1/string", response_class=PlainTextResponse)
-async def simple_string_query_get(q: str):
+async def simple_string_query_get(request: Request, q: str):
     """
     Simple endpoint that accepts a string as a query parameter and returns a response from Grok.
     Example: GET /v1/string?q=Hello
     """
-    return await handle_grok_str_request(q)
+    return await handle_grok_str_request(request, q)
 
 
 @app.post("/v1/string", response_class=PlainTextResponse)
@@ -97,40 +302,47 @@ async def simple_string_query_post(request: Request):
     data = await request.body()
     q = data.decode("utf-8").strip()
 
-    return await handle_grok_str_request(q)
+    return await handle_grok_str_request(request, q)
+
+
+def messages_to_payload(messages: List[Message]) -> str:
+    """Flattens OpenAI-style messages into one Grok message: the history as JSON followed by the user message."""
+    history_messages = []
+    last_user_message = ""
+
+    for msg in messages:
+        if msg.role == "user" and not last_user_message:
+            last_user_message = msg.content
+        else:
+            sender = "USER" if msg.role == "user" else "ASSISTANT" if msg.role == "assistant" else "SYSTEM"
+            history_messages.append({"sender": sender, "message": msg.content})
+
+    if history_messages:
+        history_json = json.dumps(history_messages)
+        return f"{history_json}\n{last_user_message}" if last_user_message else history_json
+    return last_user_message
 
 
 @app.post("/v1/chat/completions")
 async def chat_completions(
         request: ChatCompletionRequest,
+        http_request: Request,
 ):
     """Endpoint for processing requests in OpenAI format."""
+    http_request.state.model = request.model
     try:
         if request.stream:
             raise HTTPException(status_code=400, detail="Streaming is not supported.")
 
         grok_client.cookies = env_cookies
 
-        history_messages = []
-        last_user_message = ""
-
-        for msg in request.messages:
-            if msg.role == "user" and not last_user_message:
-                last_user_message = msg.content
-            else:
-                sender = "USER" if msg.role == "user" else "ASSISTANT" if msg.role == "assistant" else "SYSTEM"
-                history_messages.append({"sender": sender, "message": msg.content})
-
-        if history_messages:
-            history_json = json.dumps(history_messages)
-            message_payload = f"{history_json}\n{last_user_message}" if last_user_message else history_json
-        else:
-            message_payload = last_user_message
+        message_payload = messages_to_payload(request.messages)
 
         if not message_payload.strip():
             raise HTTPException(status_code=400, detail="No user message provided.")
 
-        response: GrokResponse = await grok_client.async_ask(
+        response: GrokResponse = await scheduled_ask(
+            http_request,
             message=message_payload,
             modelName=request.model,
             timeout=TIMEOUT,
@@ -141,15 +353,15 @@ async def chat_completions(
             enableSideBySide=False
         )
 
-        if response.error or not response.modelResponse.message:
+        summary = response.summary()
+        if summary.error or not summary.message:
             raise HTTPException(
                 status_code=500,
-                detail=response.error or "No response from Grok API."
+                detail=summary.error or "No response from Grok API."
             )
 
-        import time
         current_time = int(time.time())
-        response_id = response.responseId or f"chatcmpl-{current_time}"
+        response_id = summary.responseId or f"chatcmpl-{current_time}"
 
         chat_response = ChatCompletionResponse(
             id=response_id,
@@ -160,24 +372,72 @@ async def chat_completions(
                     index=0,
                     message=Message(
                         role="assistant",
-                        content=response.modelResponse.message
+                        content=summary.message
                     ),
                     finish_reason="stop"
                 )
             ],
             usage={
                 "prompt_tokens": len(message_payload.split()),
-                "completion_tokens": len(response.modelResponse.message.split()),
-                "total_tokens": len(message_payload.split()) + len(response.modelResponse.message.split())
+                "completion_tokens": len(summary.message.split()),
+                "total_tokens": len(message_payload.split()) + len(summary.message.split())
             }
         )
 
         return chat_response
 
+    except HTTPException:
+        raise
     except Exception as ex:
         logger.error(f"Error in chat_completions: {ex}")
         raise HTTPException(status_code=500, detail=str(ex))
 
+@app.post("/v1/jobs", status_code=202)
+async def create_job(request: JobRequest, http_request: Request):
+    """
+    Queues a long-running request (deep search, reasoning) and returns its id immediately.
+    Poll GET /v1/jobs/{id} for the result, or pass `webhook` to get the job POSTed there when it finishes.
+    """
+    http_request.state.model = request.model
+    message_payload = messages_to_payload(request.messages)
+    if not message_payload.strip():
+        raise HTTPException(status_code=400, detail="No user message provided.")
+    try:
+        job = job_queue.submit(message_payload,
+                               webhook=request.webhook,
+                               tenant=request_tenant(http_request),
+                               modelName=request.model,
+                               timeout=JOB_TIMEOUT,
+                               deepsearch_preset=request.deepsearch_preset,
+                               isReasoning=request.isReasoning,
+                               enableImageGeneration=False,
+                               enableImageStreaming=False,
+                               enableSideBySide=False)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"id": job.id, "status": job.status}
+
+
+@app.get("/v1/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a job, with the result once it has finished. Finished jobs expire after GROK_JOB_RESULT_TTL seconds."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return job.to_dict()
+
+
+@app.get("/v1/scheduler")
+async def scheduler_stats():
+    """Queue depth, admissions, rejections and queue wait per priority class, the adaptive limits (GROK_ADAPTIVE_LIMITS=1)
+    and hedged requests (GROK_HEDGE_PERCENTILE)."""
+    stats = scheduler.stats()
+    stats["jobs_queued"] = job_queue.depth
+    stats["limits"] = grok_client.limits()
+    stats["hedging"] = grok_client.hedge_policy.snapshot() if grok_client.hedge_policy is not None else {}
+    return stats
+
+
 def run_server(default_host: str = "0.0.0.0", default_port: int = 8000):
     parser = argparse.ArgumentParser(description="Run Grok3API-compatible server.")
     parser.add_argument(
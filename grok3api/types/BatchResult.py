@@ -0,0 +1,20 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from grok3api.types.GrokResponse import GrokResponse
+
+
+@dataclass
+class BatchResult:
+    """Result of one prompt of GrokClient.ask_many() / async_ask_many()."""
+    index: int
+    message: str
+    kwargs: Dict[str, Any] = field(default_factory=dict, repr=False)
+    response: Optional[GrokResponse] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.response is not None
@@ -1,10 +1,19 @@
 import asyncio
+import base64
+import functools
+import os
+import time
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from dataclasses import dataclass
-from typing import Optional, List
+from dataclasses import dataclass, field
+from typing import Optional, List, Tuple, Union
 
-from grok3api.logger import logger
+from grok3api.logger import logger, debug_event
+from grok3api import cache as content_cache
 from grok3api import driver
+from grok3api.concurrency import RequestHandle
 
 try:
     import aiofiles
@@ -17,17 +26,26 @@ class GeneratedImage:
     url: str
     _base_url: str = "https://assets.grok.com"
     cookies: Optional[List[dict]] = None
+    _session: Optional[driver.CookieSnapshot] = field(default=None, repr=False, compare=False)
 
     def __post_init__(self):
         """
-        After initialization, check driver.DRIVER and get cookies for _base_url,
-        if the driver is available. Otherwise, save cookies as None.
+        Unless cookies are given explicitly, attach the shared cookie snapshot of the current browser session.
+        No browser call is made here: the cookies are only read if the session ends before the image is downloaded.
         """
-        if driver.web_driver is not None:
-            # self.cookies = driver.web_driver.get_cookies()
-            self.cookies = driver.web_driver._driver.get_cookies()
-        else:
-            self.cookies = None
+        if self.cookies is None and self._session is None and driver.web_driver is not None:
+            self._session = driver.web_driver.cookie_snapshot()
+
+    def _cookie_source(self) -> Tuple[Optional[List[dict]], Optional[int]]:
+        """Returns the cookies to restore before downloading and the browser session they belong to."""
+        if self.cookies is not None:
+            return self.cookies, None
+        if self._session is not None:
+            return self._session.cookies, self._session.epoch
+        return None, None
+
+    def _can_download(self) -> bool:
+        return bool(self.cookies) or self._session is not None
 
     def download(self, timeout: int = driver.web_driver.TIMEOUT) -> Optional[BytesIO]:
         """Method to download an image into memory through the browser with a timeout."""
@@ -42,61 +60,64 @@ class GeneratedImage:
             logger.error(f"Error while downloading the image (download): {e}")
             return None
 
-    # async def async_download(self, timeout: int = 20) -> Optional[BytesIO]:
-    #     """Asynchronous method to download an image into memory with a timeout.
-    #
-    #     Args:
-    #         timeout (int): Timeout in seconds (default is 20).
-    #
-    #     Returns:
-    #         Optional[BytesIO]: BytesIO object with image data or None in case of an error.
-    #     """
-    #     try:
-    #         image_data = await asyncio.to_thread(self._fetch_image, timeout=timeout, proxy=driver.web_driver.def_proxy)
-    #         if image_data is None:
-    #             return None
-    #         image_buffer = BytesIO(image_data)
-    #         image_buffer.seek(0)
-    #         return image_buffer
-    #     except Exception as e:
-    #         logger.error(f"Error while downloading the image (download): {e}")
-    #         return None
-    #
-    # async def async_save_to(self, path: str, timeout: int = 10) -> None:
-    #     """Asynchronously downloads the image and saves it to a file with a timeout.
-    #
-    #     Args:
-    #         path (str): Path to save the file.
-    #         timeout (int): Timeout in seconds (default is 10).
-    #     """
-    #     try:
-    #         logger.debug(f"Attempting to save the image to a file: {path}")
-    #         image_data = await asyncio.to_thread(self._fetch_image, timeout=timeout, proxy=driver.web_driver.def_proxy)
-    #         image_data = BytesIO(image_data)
-    #         if image_data is not None:
-    #             if AIOFILES_AVAILABLE:
-    #                 async with aiofiles.open(path, "wb") as f:
-    #                     await f.write(image_data.getbuffer())
-    #             else:
-    #                 def write_file_sync(file_path: str, data: BytesIO):
-    #                     with open(file_path, "wb") as file:
-    #                         file.write(data.getbuffer())
-    #
-    #                 await asyncio.to_thread(write_file_sync, path, image_data)
-    #             logger.debug(f"Image successfully saved to: {path}")
-    #         else:
-    #             logger.error("The image was not downloaded, saving canceled.")
-    #     except Exception as e:
-    #         logger.error(f"In save_to: {e}")
+    async def async_download(self, timeout: int = driver.web_driver.TIMEOUT) -> Optional[BytesIO]:
+        """Asynchronous method to download an image into memory with a timeout.
+
+        Concurrent calls are fetched together in one browser round trip on a shared worker thread.
+
+        Args:
+            timeout (int): Timeout in seconds.
+
+        Returns:
+            Optional[BytesIO]: BytesIO object with image data or None in case of an error.
+        """
+        try:
+            image_data = await _async_fetch_image(self, timeout)
+            if image_data is None:
+                return None
+            return BytesIO(image_data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error while downloading the image (async_download): {e}")
+            return None
+
+    async def async_save_to(self, path: str, timeout: int = driver.web_driver.TIMEOUT) -> bool:
+        """Asynchronously downloads the image and saves it to a file with a timeout.
+
+        Args:
+            path (str): Path to save the file.
+            timeout (int): Timeout in seconds.
+        """
+        try:
+            debug_event("Saving the image", path=path)
+            if content_cache.image_cache is not None and self.full_url in content_cache.image_cache:
+                loop = asyncio.get_running_loop()
+                if await loop.run_in_executor(None, self._copy_from_cache, path):
+                    return True
+            image_data = await _async_fetch_image(self, timeout)
+            if image_data is None:
+                logger.debug("The image was not downloaded, saving canceled.")
+                return False
+            await _async_write_file(path, image_data)
+            debug_event("Image saved", path=path)
+            return True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"In async_save_to: {e}")
+            return False
 
     def download_to(self, path: str, timeout: int = driver.web_driver.TIMEOUT) -> None:
         """Downloads the image to a file through the browser with a timeout."""
         try:
+            if self._copy_from_cache(path):
+                return
             image_data = self._fetch_image(timeout=timeout)
             if image_data is not None:
                 with open(path, "wb") as f:
                     f.write(image_data)
-                logger.debug(f"Image saved to: {path}")
+                debug_event("Image saved", path=path)
             else:
                 logger.debug("The image was not downloaded, saving canceled.")
         except Exception as e:
@@ -105,12 +126,14 @@ class GeneratedImage:
     def save_to(self, path: str, timeout: int = driver.web_driver.TIMEOUT) -> bool:
         """Downloads the image using download() and saves it to a file with a timeout."""
         try:
-            logger.debug(f"Attempting to save the image to a file: {path}")
+            debug_event("Saving the image", path=path)
+            if self._copy_from_cache(path):
+                return True
             image_data = self.download(timeout=timeout)
             if image_data is not None:
                 with open(path, "wb") as f:
                     f.write(image_data.getbuffer())
-                logger.debug(f"Image successfully saved to: {path}")
+                debug_event("Image saved", path=path)
                 return True
             else:
                 logger.debug("The image was not downloaded, saving canceled.")
@@ -119,82 +142,363 @@ class GeneratedImage:
             logger.error(f"In save_to: {e}")
             return False
 
+    def _copy_from_cache(self, path: str) -> bool:
+        """Copies the image from the local content cache to a file, if it is cached."""
+        cache = content_cache.image_cache
+        if cache is not None and cache.copy_to(self.full_url, path):
+            debug_event("Image copied from the cache", path=path)
+            return True
+        return False
+
+    @property
+    def full_url(self) -> str:
+        image_url = self.url if self.url.startswith('/') else '/' + self.url
+        return self._base_url + image_url
+
     def _fetch_image(self, timeout: int = driver.web_driver.TIMEOUT, proxy: Optional[str] = driver.web_driver.def_proxy) -> Optional[bytes]:
-        """Private function to download an image through the browser with a timeout."""
-        if not self.cookies or len(self.cookies) == 0:
-            logger.debug("No cookies for image download.")
+        """Private function to download an image through the browser with a timeout.
+        The request runs in a background tab on the assets origin, so the grok.com page is not navigated away."""
+        image_data, error = _fetch_images([self], timeout=timeout, proxy=proxy)[0]
+        if error is not None:
+            logger.error(f"Error while downloading the image: {error}")
             return None
+        logger.debug("Image successfully downloaded through the browser.")
+        return image_data
 
-        image_url = self.url if self.url.startswith('/') else '/' + self.url
-        full_url = self._base_url + image_url
-        logger.debug(f"Full URL for image download: {full_url}, timeout: {timeout} sec")
-
-        fetch_script = f"""
-        console.log("Starting fetch with credentials: 'include'");
-        console.log("Cookies in browser before fetch:", document.cookie);
-
-        const request = fetch('{full_url}', {{
-            method: 'GET'
-        }})
-        .then(response => {{
-            console.log("Response status:", response.status);
-            console.log("Response headers:", Array.from(response.headers.entries()));
-            const contentType = response.headers.get('Content-Type');
-            if (!response.ok) {{
-                console.log("Request failed with status:", response.status);
-                return 'Error: HTTP ' + response.status;
-            }}
-            if (!contentType || !contentType.startsWith('image/')) {{
-                return response.text().then(text => {{
-                    console.log("Invalid MIME type detected:", contentType);
-                    console.log("Response content:", text);
-                    return 'Error: Invalid MIME type: ' + contentType + ', content: ' + text;
-                }});
-            }}
-            return response.arrayBuffer();
-        }})
-        .then(buffer => {{
-            console.log("Image data received, length:", buffer.byteLength);
-            return Array.from(new Uint8Array(buffer));
-        }})
-        .catch(error => {{
-            console.log("Fetch error:", error.toString());
-            return 'Error: ' + error;
-        }});
-
-        console.log("Fetch request sent, awaiting response...");
-        return request;
-        """
-        driver.web_driver.init_driver(wait_loading=False)
+
+@dataclass
+class ImageDownloadResult:
+    """Result of downloading one image with download_all() / save_all()."""
+    image: GeneratedImage
+    buffer: Optional[BytesIO] = None
+    path: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+_START_FETCH_IMAGES_SCRIPT = """
+const [id, urls, timeoutMs] = arguments;
+const batches = window.__grok3api_images = window.__grok3api_images || {};
+const entry = batches[id] = { results: null, controller: new AbortController() };
+const timer = setTimeout(() => entry.controller.abort(), timeoutMs);
+
+const toBase64 = buffer => new Promise((resolve, reject) => {
+    const reader = new FileReader();
+    reader.onload = () => resolve(reader.result.slice(reader.result.indexOf(',') + 1));
+    reader.onerror = () => reject(reader.error);
+    reader.readAsDataURL(new Blob([buffer]));
+});
+
+Promise.all(urls.map(url => fetch(url, { method: 'GET', signal: entry.controller.signal })
+    .then(response => {
+        const contentType = response.headers.get('Content-Type');
+        if (!response.ok) {
+            return response.text().then(text => ({ error: 'HTTP ' + response.status + ' - ' + text }));
+        }
+        if (!contentType || !contentType.startsWith('image/')) {
+            return response.text().then(text => ({ error: 'Invalid MIME type: ' + contentType + ', content: ' + text }));
+        }
+        return response.arrayBuffer().then(toBase64).then(data => ({ data: data }));
+    })
+    .catch(error => ({ error: error.name === 'AbortError' ? 'TimeoutError' : String(error) }))
+)).then(results => {
+    clearTimeout(timer);
+    entry.results = results;
+});
+return id;
+"""
+
+_POLL_FETCH_IMAGES_SCRIPT = """
+const batches = window.__grok3api_images || {};
+const entry = batches[arguments[0]];
+if (!entry) {
+    return { done: true, error: 'The image batch was lost (page reloaded?)' };
+}
+if (entry.results === null) {
+    return { done: false };
+}
+delete batches[arguments[0]];
+return { done: true, results: entry.results };
+"""
+
+_ABORT_FETCH_IMAGES_SCRIPT = """
+const batches = window.__grok3api_images || {};
+const entry = batches[arguments[0]];
+if (entry) {
+    delete batches[arguments[0]];
+    entry.controller.abort();
+}
+"""
+
+_POLL_INTERVAL = 0.1
+
+_REGION_ERROR = 'This service is not available in your region'
+
+
+def _fetch_images(images: List[GeneratedImage],
+                  timeout: int = driver.web_driver.TIMEOUT,
+                  proxy: Optional[str] = driver.web_driver.def_proxy,
+                  handle: Optional[RequestHandle] = None) -> List[Tuple[Optional[bytes], Optional[str]]]:
+    """
+    Downloads several images concurrently with a single Promise.all in the assets tab.
+    Images found in the local content cache are returned without touching the browser.
+    The batch is started in the page and polled, so cancelling `handle` aborts the fetch in the page.
+    Returns (data, error) for every image, in the same order.
+    """
+    results: List[Tuple[Optional[bytes], Optional[str]]] = [(None, "No cookies for image download.")] * len(images)
+    cache = content_cache.image_cache
+    if cache is not None:
+        for index, image in enumerate(images):
+            data = cache.get(image.full_url)
+            if data is not None:
+                results[index] = (data, None)
+    pending = [index for index, image in enumerate(images) if image._can_download() and results[index][1] is not None]
+    if not pending:
+        return results
+
+    urls = [images[index].full_url for index in pending]
+    handle = handle or RequestHandle()
+    debug_event("Downloading images", count=len(urls), timeout=timeout)
+
+    def abort(batch_id: str):
         try:
-            try:
-                for cookie in self.cookies:
-                    if 'name' in cookie and 'value' in cookie:
-                        if 'domain' not in cookie or not cookie['domain']:
-                            cookie['domain'] = '.grok.com'
-                        driver.web_driver.add_cookie(cookie)
-                    else:
-                        logger.warning(f"Skipped invalid cookie: {cookie}")
-                logger.debug(f"Cookies set: {self.cookies}")
-            except Exception as e:
-                logger.error(f"Error while setting cookies: {e}")
-                return None
+            driver.web_driver.execute_on_origin(urls[0], _ABORT_FETCH_IMAGES_SCRIPT, batch_id)
+        except Exception as e:
+            logger.debug(f"In _fetch_images abort: {e}")
 
-            driver.web_driver.get(full_url)
-            response = driver.web_driver.execute_script(fetch_script)
-            if response and 'This service is not available in your region' in response:
+    def run_batch():
+        for index in pending:
+            driver.web_driver.ensure_cookies(*images[index]._cookie_source())
+        batch_id = uuid.uuid4().hex
+        driver.web_driver.execute_on_origin(urls[0], _START_FETCH_IMAGES_SCRIPT, batch_id, urls, timeout * 1000)
+        if not handle.attach(batch_id, lambda: abort(batch_id)):
+            abort(batch_id)
+            return None
+        try:
+            deadline = time.monotonic() + timeout + 5
+            while not handle.wait(_POLL_INTERVAL):
+                state = driver.web_driver.execute_on_origin(urls[0], _POLL_FETCH_IMAGES_SCRIPT, batch_id)
+                if state.get("done"):
+                    if state.get("error"):
+                        raise RuntimeError(state["error"])
+                    return state.get("results")
+                if time.monotonic() > deadline:
+                    abort(batch_id)
+                    return [{"error": "TimeoutError"}] * len(urls)
+            return None
+        finally:
+            handle.detach(batch_id)
+
+    try:
+        if driver.web_driver._driver is None:
+            driver.web_driver.init_driver(wait_loading=False)
+
+        with driver.web_driver.request_slot():
+            response = run_batch()
+            if any(_REGION_ERROR in (item or {}).get("error", "") for item in response or []):
                 driver.web_driver.set_proxy(proxy)
-                driver.web_driver.get(full_url)
-                response = driver.web_driver.execute_script(fetch_script)
-            driver.web_driver.get(driver.web_driver.BASE_URL)
+                response = run_batch()
+    except Exception as e:
+        logger.error(f"Error executing script in the browser: {e}")
+        return [(None, str(e))] * len(images)
+
+    if handle.cancelled:
+        for index in pending:
+            results[index] = (None, "Cancelled")
+        return results
+
+    for index, item in zip(pending, response or []):
+        if not isinstance(item, dict):
+            results[index] = (None, f"Unexpected response: {item}")
+        elif "data" in item:
+            data = base64.b64decode(item["data"])
+            results[index] = (data, None)
+            if cache is not None:
+                cache.set(images[index].full_url, data)
+        else:
+            results[index] = (None, item.get("error") or "Unknown error")
+    return results
+
+
+_IMAGE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="grok3api-images")
+
+
+class _AsyncImageBatcher:
+    """
+    Collects images requested in the same event loop iteration and fetches them with one
+    _fetch_images call on a single shared worker thread instead of a thread per transfer.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._pending: List[Tuple[GeneratedImage, int, asyncio.Future]] = []
+
+    def fetch(self, image: GeneratedImage, timeout: int) -> asyncio.Future:
+        future = self._loop.create_future()
+        if not self._pending:
+            self._loop.call_soon(self._flush)
+        self._pending.append((image, timeout, future))
+        return future
+
+    def _flush(self):
+        batch = [item for item in self._pending if not item[2].done()]
+        self._pending = []
+        if not batch:
+            return
+        images = [image for image, _, _ in batch]
+        timeout = max(timeout for _, timeout, _ in batch)
+        handle = RequestHandle()
+        task = self._loop.run_in_executor(_IMAGE_EXECUTOR, functools.partial(_fetch_images, images, timeout,
+                                                                              handle=handle))
+
+        def abandon(_: asyncio.Future):
+            # Once every caller has given up (cancelled or timed out), abort the fetch in the page
+            if all(future.cancelled() for _, _, future in batch):
+                handle.cancel()
+
+        for _, _, future in batch:
+            future.add_done_callback(abandon)
+
+        def distribute(done: asyncio.Future):
+            for index, (_, _, future) in enumerate(batch):
+                if future.done():
+                    continue
+                if done.cancelled():
+                    future.cancel()
+                elif done.exception() is not None:
+                    future.set_exception(done.exception())
+                else:
+                    future.set_result(done.result()[index])
+
+        task.add_done_callback(distribute)
+
+
+_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncImageBatcher]" = weakref.WeakKeyDictionary()
+
+
+async def _async_fetch(image: GeneratedImage, timeout: int) -> Tuple[Optional[bytes], Optional[str]]:
+    """Fetches one image through the batcher of the running loop. Returns (data, error)."""
+    loop = asyncio.get_running_loop()
+    cache = content_cache.image_cache
+    if cache is not None and image.full_url in cache:
+        data = await loop.run_in_executor(None, cache.get, image.full_url)
+        if data is not None:
+            return data, None
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = _batchers[loop] = _AsyncImageBatcher(loop)
+    try:
+        return await asyncio.wait_for(batcher.fetch(image, timeout), timeout)
+    except asyncio.TimeoutError:
+        return None, "TimeoutError"
+
+
+async def _async_fetch_image(image: GeneratedImage, timeout: int) -> Optional[bytes]:
+    image_data, error = await _async_fetch(image, timeout)
+    if error is not None:
+        logger.error(f"Error while downloading the image: {error}")
+        return None
+    return image_data
+
+
+async def _async_write_file(path: str, data: bytes):
+    """Writes bytes to a file without blocking the event loop."""
+    if AIOFILES_AVAILABLE:
+        async with aiofiles.open(path, "wb") as f:
+            await f.write(data)
+    else:
+        def write_file_sync(file_path: str, content: bytes):
+            with open(file_path, "wb") as file:
+                file.write(content)
+
+        await asyncio.get_running_loop().run_in_executor(None, write_file_sync, path, data)
+
+
+def _to_results(images: List[GeneratedImage],
+                fetched: List[Tuple[Optional[bytes], Optional[str]]]) -> List[ImageDownloadResult]:
+    results = []
+    for image, (data, error) in zip(images, fetched):
+        if error is not None:
+            logger.error(f"Error while downloading the image {image.url}: {error}")
+            results.append(ImageDownloadResult(image=image, error=error))
+        else:
+            results.append(ImageDownloadResult(image=image, buffer=BytesIO(data)))
+    return results
+
+
+def download_all(images: List[GeneratedImage], timeout: int = driver.web_driver.TIMEOUT) -> List[ImageDownloadResult]:
+    """Downloads all images concurrently into memory. Results are returned in the order of `images`."""
+    return _to_results(images, _fetch_images(images, timeout=timeout))
+
+
+def _resolve_paths(images: List[GeneratedImage], target: Union[str, List[str]]) -> List[str]:
+    """Turns a directory or a list of paths into one path per image."""
+    if isinstance(target, str):
+        os.makedirs(target, exist_ok=True)
+        paths = []
+        for index, image in enumerate(images):
+            extension = os.path.splitext(image.url)[1] or ".jpg"
+            paths.append(os.path.join(target, f"{index}{extension}"))
+        return paths
+    if len(target) != len(images):
+        raise ValueError("The number of paths must match the number of images")
+    return list(target)
+
+
+def save_all(images: List[GeneratedImage],
+             target: Union[str, List[str]],
+             timeout: int = driver.web_driver.TIMEOUT) -> List[ImageDownloadResult]:
+    """
+    Downloads all images concurrently and writes them to files.
+
+    Args:
+        images (List[GeneratedImage]): Images to save.
+        target (str / List[str]): A directory (files are named `0.jpg`, `1.jpg`, ...) or one path per image.
+        timeout (int): Timeout in seconds for the whole batch.
+    """
+    paths = _resolve_paths(images, target)
+    results = download_all(images, timeout=timeout)
+    for result, path in zip(results, paths):
+        if not result.ok:
+            continue
+        try:
+            with open(path, "wb") as f:
+                f.write(result.buffer.getbuffer())
+            result.path = path
+            debug_event("Image saved", path=path)
         except Exception as e:
-            logger.error(f"Error executing script in the browser: {e}")
-            return None
+            result.error = str(e)
+            logger.error(f"In save_all: {e}")
+    return results
 
-        if isinstance(response, str) and response.startswith('Error:'):
-            logger.error(f"Error while downloading the image: {response}")
-            return None
 
-        image_data = bytes(response)
-        logger.debug("Image successfully downloaded through the browser.")
-        return image_data
+async def async_download_all(images: List[GeneratedImage], timeout: int = driver.web_driver.TIMEOUT) -> List[ImageDownloadResult]:
+    """Asynchronous version of download_all. All images go to the browser in one batch."""
+    fetched = await asyncio.gather(*(_async_fetch(image, timeout) for image in images))
+    return _to_results(images, fetched)
+
+
+async def async_save_all(images: List[GeneratedImage],
+                         target: Union[str, List[str]],
+                         timeout: int = driver.web_driver.TIMEOUT) -> List[ImageDownloadResult]:
+    """Asynchronous version of save_all. Files are written without blocking the event loop."""
+    paths = _resolve_paths(images, target)
+    fetched = await asyncio.gather(*(_async_fetch(image, timeout) for image in images))
+    results = _to_results(images, fetched)
+
+    async def write(result: ImageDownloadResult, data: Optional[bytes], path: str):
+        if not result.ok:
+            return
+        try:
+            await _async_write_file(path, data)
+            result.path = path
+            debug_event("Image saved", path=path)
+        except Exception as e:
+            result.error = str(e)
+            logger.error(f"In async_save_all: {e}")
+
+    await asyncio.gather(*(write(result, data, path) for result, (data, _), path in zip(results, fetched, paths)))
+    return results
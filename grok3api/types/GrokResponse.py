@@ -1,100 +1,204 @@
-from dataclasses import dataclass, field
-from typing import List, Optional, Any, Dict, Union
+from dataclasses import dataclass
+from typing import List, Optional, Any, Dict, Union, NamedTuple, Callable
 
+from grok3api import driver
 from grok3api.logger import logger
-from grok3api.types.GeneratedImage import GeneratedImage
+from grok3api.types import GeneratedImage as generated_image
+from grok3api.types.GeneratedImage import GeneratedImage, ImageDownloadResult
 
 
-@dataclass
+def _field(name: str, default: Any = None, default_factory: Optional[Callable[[], Any]] = None) -> property:
+    """
+    Dataclass field backed by the raw response dict, decoded on access.
+    A missing list is created once per instance and kept beside the dict, so the raw response is never modified.
+    """
+    if default_factory is not None:
+        def getter(self):
+            value = self._data.get(name)
+            if value is None:
+                value = self._defaults.get(name)
+                if value is None:
+                    value = self._defaults[name] = default_factory()
+            return value
+    else:
+        def getter(self):
+            return self._data.get(name, default)
+
+    def setter(self, value):
+        self._defaults.pop(name, None)
+        self._data[name] = value
+
+    return property(getter, setter)
+
+
+@dataclass(init=False, repr=False)
 class ModelResponse:
-    responseId: str
-    message: str
-    sender: str
-    createTime: str
-    parentResponseId: str
-    manual: bool
-    partial: bool
-    shared: bool
-    query: str
-    queryType: str
-    webSearchResults: List[Any] = field(default_factory=list)
-    xpostIds: List[Any] = field(default_factory=list)
-    xposts: List[Any] = field(default_factory=list)
-    generatedImages: List[GeneratedImage] = field(default_factory=list)
-    imageAttachments: List[Any] = field(default_factory=list)
-    fileAttachments: List[Any] = field(default_factory=list)
-    cardAttachmentsJson: List[Any] = field(default_factory=list)
-    fileUris: List[Any] = field(default_factory=list)
-    fileAttachmentsMetadata: List[Any] = field(default_factory=list)
-    isControl: bool = False
-    steps: List[Any] = field(default_factory=list)
-    mediaTypes: List[Any] = field(default_factory=list)
+    """
+    Grok model response. Backed by the raw response dict; fields are decoded on first access.
+    It is still a dataclass: fields(), asdict() and == work on the decoded values.
+    """
+    __slots__ = ("_data", "_defaults", "_generated_images")
+
+    responseId: str = _field("responseId", "")
+    message: str = _field("message", "")
+    sender: str = _field("sender", "")
+    createTime: str = _field("createTime", "")
+    parentResponseId: str = _field("parentResponseId", "")
+    manual: bool = _field("manual", False)
+    partial: bool = _field("partial", False)
+    shared: bool = _field("shared", False)
+    query: str = _field("query", "")
+    queryType: str = _field("queryType", "")
+    webSearchResults: List[Any] = _field("webSearchResults", default_factory=list)
+    xpostIds: List[Any] = _field("xpostIds", default_factory=list)
+    xposts: List[Any] = _field("xposts", default_factory=list)
+    imageAttachments: List[Any] = _field("imageAttachments", default_factory=list)
+    fileAttachments: List[Any] = _field("fileAttachments", default_factory=list)
+    cardAttachmentsJson: List[Any] = _field("cardAttachmentsJson", default_factory=list)
+    fileUris: List[Any] = _field("fileUris", default_factory=list)
+    fileAttachmentsMetadata: List[Any] = _field("fileAttachmentsMetadata", default_factory=list)
+    isControl: bool = _field("isControl", False)
+    steps: List[Any] = _field("steps", default_factory=list)
+    mediaTypes: List[Any] = _field("mediaTypes", default_factory=list)
+    generatedImages: List[GeneratedImage]
 
     def __init__(self, data: Dict[str, Any]):
-        try:
-            self.responseId = data.get("responseId", "")
-            self.message = data.get("message", "")
-            self.sender = data.get("sender", "")
-            self.createTime = data.get("createTime", "")
-            self.parentResponseId = data.get("parentResponseId", "")
-            self.manual = data.get("manual", False)
-            self.partial = data.get("partial", False)
-            self.shared = data.get("shared", False)
-            self.query = data.get("query", "")
-            self.queryType = data.get("queryType", "")
-            self.webSearchResults = data.get("webSearchResults", [])
-            self.xpostIds = data.get("xpostIds", [])
-            self.xposts = data.get("xposts", [])
-
-            self.generatedImages = []
-            for url in data.get("generatedImageUrls", []):
-                self.generatedImages.append(GeneratedImage(url=url))
-
-            self.imageAttachments = data.get("imageAttachments", [])
-            self.fileAttachments = data.get("fileAttachments", [])
-            self.cardAttachmentsJson = data.get("cardAttachmentsJson", [])
-            self.fileUris = data.get("fileUris", [])
-            self.fileAttachmentsMetadata = data.get("fileAttachmentsMetadata", [])
-            self.isControl = data.get("isControl", False)
-            self.steps = data.get("steps", [])
-            self.mediaTypes = data.get("mediaTypes", [])
-        except Exception as e:
-            logger.error(f"В ModelResponse.__init__: {str(e)}")
+        self._data: Dict[str, Any] = data if isinstance(data, dict) else {}
+        self._defaults: Dict[str, Any] = {}
+        self._generated_images: Optional[List[GeneratedImage]] = None
 
+    @property
+    def generatedImages(self) -> List[GeneratedImage]:
+        if self._generated_images is None:
+            try:
+                self._generated_images = [GeneratedImage(url=url) for url in self._data.get("generatedImageUrls", [])]
+            except Exception as e:
+                logger.error(f"В ModelResponse.generatedImages: {str(e)}")
+                self._generated_images = []
+        return self._generated_images
 
-@dataclass
-class GrokResponse:
-    modelResponse: ModelResponse
-    isThinking: bool
-    isSoftStop: bool
+    @generatedImages.setter
+    def generatedImages(self, value: List[GeneratedImage]):
+        self._generated_images = value
+
+    @property
+    def raw(self) -> Dict[str, Any]:
+        """The underlying response dict."""
+        return self._data
+
+    def __repr__(self):
+        return f"ModelResponse(responseId={self.responseId!r}, message={self.message!r})"
+
+    def download_all(self, timeout: int = driver.web_driver.TIMEOUT) -> List[ImageDownloadResult]:
+        """Downloads all generatedImages concurrently. Results keep the order of generatedImages."""
+        return generated_image.download_all(self.generatedImages, timeout=timeout)
+
+    def save_all(self, target: Union[str, List[str]], timeout: int = driver.web_driver.TIMEOUT) -> List[ImageDownloadResult]:
+        """Downloads all generatedImages concurrently and saves them to a directory or to the given paths."""
+        return generated_image.save_all(self.generatedImages, target, timeout=timeout)
+
+    async def async_download_all(self, timeout: int = driver.web_driver.TIMEOUT) -> List[ImageDownloadResult]:
+        """Asynchronous version of download_all."""
+        return await generated_image.async_download_all(self.generatedImages, timeout=timeout)
+
+    async def async_save_all(self, target: Union[str, List[str]], timeout: int = driver.web_driver.TIMEOUT) -> List[ImageDownloadResult]:
+        """Asynchronous version of save_all."""
+        return await generated_image.async_save_all(self.generatedImages, target, timeout=timeout)
+
+
+class ResponseSummary(NamedTuple):
+    """Only the message and the ids of a response."""
+    message: str
     responseId: str
+    conversationId: Optional[str]
+    error: Optional[str]
+    error_code: Optional[Union[int, str]]
 
-    conversationId: Optional[str] = None
-    title: Optional[str] = None
-    conversationCreateTime: Optional[str] = None
-    conversationModifyTime: Optional[str] = None
-    temporary: Optional[bool] = None
 
-    error: Optional[str] = None
-    error_code: Optional[Union[int, str]] = None
+@dataclass(init=False, repr=False)
+class GrokResponse:
+    """
+    Grok response. Backed by the raw response dict; modelResponse and the other fields are decoded on first access.
+    It is still a dataclass: fields(), asdict() and == work on the decoded values.
+    """
+    __slots__ = ("_data", "_defaults", "_model_response", "_error", "_error_code", "attempts", "spans")
+
+    modelResponse: ModelResponse
+    isThinking: bool = _field("isThinking", False)
+    isSoftStop: bool = _field("isSoftStop", False)
+    responseId: str = _field("responseId", "")
+    conversationId: Optional[str] = _field("conversationId")
+    conversationCreateTime: Optional[str] = _field("createTime")
+    conversationModifyTime: Optional[str] = _field("modifyTime")
+    temporary: Optional[bool] = _field("temporary")
+    title: Optional[str]
+    error: Optional[str]
+    error_code: Optional[Union[int, str]]
 
     def __init__(self, data: Dict[str, Any]):
+        self._error: Optional[str] = None
+        self._error_code: Optional[Union[int, str]] = None
+        self.attempts: List[Any] = []  # grok3api.retry.Attempt of every request made by ask()
+        self.spans: List[Any] = []  # grok3api.metrics.Span of every phase of ask(), with a metrics_sink only
+        self._model_response: Optional[ModelResponse] = None
+        self._data: Dict[str, Any] = {}
+        self._defaults: Dict[str, Any] = {}
         try:
             self.error = data.get("error", None)
             self.error_code = data.get("error_code", None)
-            result = data.get("result", {})
-            response_data = result.get("response", {})
-
-            self.modelResponse = ModelResponse(response_data.get("modelResponse", {}))
-            self.isThinking = response_data.get("isThinking", False)
-            self.isSoftStop = response_data.get("isSoftStop", False)
-            self.responseId = response_data.get("responseId", "")
-
-            self.conversationId = response_data.get("conversationId")
-            self.title = result.get("newTitle") or result.get("title") or self.title
-            self.conversationCreateTime = response_data.get("createTime")
-            self.conversationModifyTime = response_data.get("modifyTime")
-            self.temporary = response_data.get("temporary")
+            self._data = data.get("result", {}).get("response", {})
         except Exception as e:
             self.error = str(e) if self.error is None else self.error + ' ' + str(e)
             logger.error(f"В GrokResponse.__init__: {e}")
+
+    @property
+    def modelResponse(self) -> ModelResponse:
+        if self._model_response is None:
+            self._model_response = ModelResponse(self._data.get("modelResponse", {}))
+        return self._model_response
+
+    @modelResponse.setter
+    def modelResponse(self, value: ModelResponse):
+        self._model_response = value
+
+    @property
+    def title(self) -> Optional[str]:
+        return self._data.get("newTitle") or self._data.get("title")
+
+    @title.setter
+    def title(self, value: Optional[str]):
+        self._data["newTitle"] = value
+
+    @property
+    def error(self) -> Optional[str]:
+        return self._error
+
+    @error.setter
+    def error(self, value: Optional[str]):
+        self._error = value
+
+    @property
+    def error_code(self) -> Optional[Union[int, str]]:
+        return self._error_code
+
+    @error_code.setter
+    def error_code(self, value: Optional[Union[int, str]]):
+        self._error_code = value
+
+    def summary(self) -> ResponseSummary:
+        """Fast path: returns the message and ids without decoding the rest of the response."""
+        model_response = self._data.get("modelResponse", {})
+        return ResponseSummary(message=model_response.get("message", ""),
+                               responseId=self._data.get("responseId") or model_response.get("responseId", ""),
+                               conversationId=self._data.get("conversationId"),
+                               error=self.error,
+                               error_code=self.error_code)
+
+    @property
+    def raw(self) -> Dict[str, Any]:
+        """The underlying `result.response` dict."""
+        return self._data
+
+    def __repr__(self):
+        return (f"GrokResponse(responseId={self.responseId!r}, conversationId={self.conversationId!r}, "
+                f"error={self.error!r}, modelResponse={self.modelResponse!r})")
@@ -0,0 +1,33 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from grok3api.types.GeneratedImage import GeneratedImage
+
+
+@dataclass
+class ImageProgress:
+    """Intermediate frame of a streamed image generation (enableImageStreaming=True)."""
+    imageId: str
+    imageUrl: str
+    seq: int
+    progress: int
+    moderated: bool = False
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ImageProgress":
+        return cls(imageId=data.get("imageId", ""),
+                   imageUrl=data.get("imageUrl", ""),
+                   seq=data.get("seq", 0),
+                   progress=data.get("progress", 0),
+                   moderated=data.get("moderated", False))
+
+    @property
+    def is_final(self) -> bool:
+        return self.progress >= 100
+
+    @property
+    def image(self) -> Optional[GeneratedImage]:
+        """Partial preview of the image at this stage, downloadable like any generated image."""
+        if not self.imageUrl:
+            return None
+        return GeneratedImage(url=self.imageUrl)
@@ -0,0 +1,121 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from grok3api import driver
+from grok3api.logger import logger
+
+
+@dataclass
+class RecyclePolicy:
+    """
+    Thresholds after which the browser is restarted between requests. `None` disables a threshold.
+
+    :param max_requests: Number of requests served by one browser.
+    :param max_age: Browser lifetime in seconds.
+    :param max_memory_mb: Browser process tree RSS (or renderer JS heap, if RSS is unavailable) in megabytes.
+    :param max_error_rate: Share of failed requests, checked once at least `min_requests_for_error_rate` were served.
+    :param min_requests_for_error_rate: Minimum number of requests before the error rate is taken into account.
+    :param check_interval: How often the watchdog checks the browser, in seconds.
+    """
+    max_requests: Optional[int] = 200
+    max_age: Optional[float] = 2 * 60 * 60
+    max_memory_mb: Optional[float] = 1500
+    max_error_rate: Optional[float] = 0.5
+    min_requests_for_error_rate: int = 10
+    check_interval: float = 30.0
+
+    def error_rate_exceeded(self, web_driver: "driver.WebDriverSingleton") -> bool:
+        return (self.max_error_rate is not None
+                and web_driver.request_count >= self.min_requests_for_error_rate
+                and web_driver.error_count / web_driver.request_count >= self.max_error_rate)
+
+    def reason_to_recycle(self, web_driver: "driver.WebDriverSingleton") -> Optional[str]:
+        """Returns the reason the browser should be recycled, or None if it is within all thresholds."""
+        if self.max_requests is not None and web_driver.request_count >= self.max_requests:
+            return f"served {web_driver.request_count} requests"
+
+        age = time.monotonic() - web_driver.started_at
+        if self.max_age is not None and age >= self.max_age:
+            return f"running for {int(age)} sec"
+
+        if self.error_rate_exceeded(web_driver):
+            return f"error rate {web_driver.error_count}/{web_driver.request_count}"
+
+        proxy_pool = web_driver.proxy_pool
+        if proxy_pool is not None and not proxy_pool.is_healthy(web_driver.current_proxy):
+            return f"proxy {web_driver.current_proxy} is unhealthy"
+
+        if self.max_memory_mb is not None:
+            # The CDP probe runs in the page, so it is skipped while requests use it; RSS is read from the OS.
+            usage = web_driver.get_memory_usage(js_heap=web_driver.in_flight == 0)
+            memory_mb = usage.get("rss_mb", usage.get("js_heap_mb"))
+            if memory_mb is not None and memory_mb >= self.max_memory_mb:
+                return f"using {int(memory_mb)} MB of memory"
+        return None
+
+
+class BrowserWatchdog:
+    """
+    Background thread that checks the browser against a RecyclePolicy. A recycle is requested even under load:
+    new requests then wait until the running ones finish and the browser is restarted.
+    """
+
+    def __init__(self, policy: RecyclePolicy, web_driver: Optional["driver.WebDriverSingleton"] = None):
+        self.policy = policy
+        self.web_driver = web_driver or driver.web_driver
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="grok3api-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.policy.check_interval)
+        self._thread = None
+
+    def check(self) -> Optional[str]:
+        """Runs one check. Returns the recycle reason if a recycle was requested."""
+        web_driver = self.web_driver
+        if not web_driver._driver:
+            return None
+        reason = self.policy.reason_to_recycle(web_driver)
+        if reason is not None:
+            # A browser recycled for failing requests must not hand its session to the next one.
+            web_driver.request_recycle(reason, healthy=not self.policy.error_rate_exceeded(web_driver))
+            web_driver.recycle_if_idle()
+        return reason
+
+    def _run(self):
+        while not self._stop_event.wait(self.policy.check_interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"In BrowserWatchdog: {e}")
+
+
+_watchdog: Optional[BrowserWatchdog] = None
+
+
+def start_watchdog(policy: RecyclePolicy) -> BrowserWatchdog:
+    """Starts the watchdog for the shared browser, replacing the policy of an already running one."""
+    global _watchdog
+    if _watchdog is not None:
+        _watchdog.stop()
+    _watchdog = BrowserWatchdog(policy)
+    _watchdog.start()
+    return _watchdog
+
+
+def stop_watchdog():
+    global _watchdog
+    if _watchdog is not None:
+        _watchdog.stop()
+        _watchdog = None
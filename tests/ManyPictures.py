@@ -11,8 +11,10 @@ def main():
         result = client.ask(message)
 
         if result and result.modelResponse and result.modelResponse.generatedImages:
-            image = result.modelResponse.generatedImages[0]
-            image.save_to(f"images/{i}.png")
+            paths = [f"images/{i}_{index}.png" for index in range(len(result.modelResponse.generatedImages))]
+            for saved in result.modelResponse.save_all(paths):
+                if not saved.ok:
+                    print(f"Error: failed to save {saved.image.url}: {saved.error}")
         else:
             print(f"Error: failed to obtain image for iteration {i}.")
 
@@ -199,10 +199,11 @@ async def handle_message(message: Message):
             logger.debug(f"Sending {len(response.modelResponse.generatedImages)} images")
             await bot.send_chat_action(chat_id=message.chat.id, action="upload_photo")
             media = []
-            for img in response.modelResponse.generatedImages:
-                image_file = await img.async_download()
-                image_file.seek(0)
-                media.append(InputMediaPhoto(media=BufferedInputFile(image_file.read(), filename="image.jpg")))
+            for result in await response.modelResponse.async_download_all():
+                if not result.ok:
+                    logger.error(f"Failed to download image {result.image.url}: {result.error}")
+                    continue
+                media.append(InputMediaPhoto(media=BufferedInputFile(result.buffer.getvalue(), filename="image.jpg")))
 
             await bot.send_media_group(chat_id=message.chat.id, media=media)
             logger.debug("Images sent")
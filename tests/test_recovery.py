@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from grok3api import driver
+from grok3api.client import GrokClient
+from grok3api.retry import RetryPolicy
+
+LOST = {"error_code": "Unknown", "error": "Error: the request was lost (page reloaded?)", "details": [], "status": 0}
+LIMITED = {"error_code": 8, "error": "Too many requests", "details": [], "status": 429}
+
+
+class FakePage:
+    """Stands in for the grok.com tab: a session restart reloads it and loses every request still streaming."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reloads = 0
+        self.lost = 0
+        self.limited = set()
+
+    def restart_session(self):
+        with self.lock:
+            self.reloads += 1
+            driver.web_driver.cookie_epoch += 1
+
+    def send(self, client, payload, headers, timeout, on_image_progress=None, handle=None):
+        reloads = self.reloads
+        message = payload["message"]
+        time.sleep(0.2 if message == "limited" else 0.4)
+        with self.lock:
+            if self.reloads != reloads:
+                self.lost += 1
+                return dict(LOST)
+            if message == "limited" and message not in self.limited:
+                self.limited.add(message)
+                return dict(LIMITED)
+        return {"result": {"response": {"modelResponse": {"message": f"answer to {message}", "responseId": "r"}}}}
+
+
+@pytest.fixture
+def page(monkeypatch):
+    page = FakePage()
+    web_driver = driver.web_driver
+    monkeypatch.setattr(web_driver, "init_driver", lambda *args, **kwargs: None)
+    monkeypatch.setattr(web_driver, "set_cookies", lambda cookies: None)
+    monkeypatch.setattr(web_driver, "restart_session", page.restart_session)
+    monkeypatch.setattr(GrokClient, "_send_request", lambda client, *args, **kwargs: page.send(client, *args, **kwargs))
+    return page
+
+
+def test_recovery_waits_for_concurrent_requests(page):
+    client = GrokClient(retry_policy=RetryPolicy(base_delay=0, max_delay=0))
+    prompts = ["limited", "first", "second", "third"]
+
+    results = list(client.ask_many(prompts, concurrency=4))
+
+    assert all(result.error is None for result in results), [result.error for result in results]
+    assert page.reloads == 1
+    assert page.lost == 0
+    assert driver.web_driver.in_flight == 0
+
+
+def test_concurrent_recoveries_reset_the_session_once(page):
+    web_driver = driver.web_driver
+    epoch = web_driver.cookie_epoch
+    ran = []
+
+    def request():
+        web_driver.begin_request()
+        try:
+            ran.append(web_driver.recover(web_driver.restart_session, epoch))
+        finally:
+            web_driver.end_request()
+
+    threads = [threading.Thread(target=request) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert sorted(ran) == [False, False, True]
+    assert page.reloads == 1
+    assert web_driver.in_flight == 0
@@ -0,0 +1,18 @@
+import pytest
+
+from grok3api.retry import classify, RATE_LIMIT, REQUEST, TRANSPORT
+
+
+@pytest.mark.parametrize("response, expected", [
+    ({"result": {"response": {}}}, None),
+    ({"error_code": 8, "error": "Too many requests", "status": 429}, RATE_LIMIT),
+    ({"error_code": "Unknown", "error": "Error: HTTP 400 - bad payload", "status": 400}, REQUEST),
+    ({"error_code": "Unknown", "error": "Error: HTTP 502 - <html>Bad gateway</html>", "status": 502}, TRANSPORT),
+    ({"error_code": 13, "error": "Internal error", "status": 500}, TRANSPORT),
+    ({"error_code": "Unknown", "error": "Error: TypeError: Failed to fetch", "status": 0}, TRANSPORT),
+    ({"error_code": "Unknown", "error": "Error: the request was lost (page reloaded?)", "status": 0}, TRANSPORT),
+    ({"error_code": "Transport", "error": "Error: no such window"}, TRANSPORT),
+    ({}, TRANSPORT),
+])
+def test_classify(response, expected):
+    assert classify(response) == expected